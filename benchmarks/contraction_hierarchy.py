@@ -0,0 +1,63 @@
+"""
+Benchmark for Contraction Hierarchies on grids.
+
+Builds :code:`cspath.Graph.contraction_hierarchy` on jittered k x k grids, the hardest case for it, and
+prints the preprocessing time, the number of shortcuts relative to the number of edges, and the average
+query time next to :code:`cspath.Graph.dijkstra` and :code:`cspath.Graph.bidirectional_dijkstra`.
+
+Usage: python benchmarks/contraction_hierarchy.py [k ...]
+"""
+import os
+import sys
+import numpy as np
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cspath import Graph
+
+
+def jittered_grid(k, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    cells = np.arange(k * k).reshape(k, k)
+    coords = np.zeros((k * k, 3))
+    coords[:, 0] = cells.ravel() // k + rng.uniform(-0.3, 0.3, k * k)
+    coords[:, 1] = cells.ravel() % k + rng.uniform(-0.3, 0.3, k * k)
+
+    edges = np.concatenate((np.stack((cells[:, :-1].ravel(), cells[:, 1:].ravel()), 1),
+                            np.stack((cells[:-1].ravel(), cells[1:].ravel()), 1)))
+
+    return Graph.from_arrays(coords, edges, np.ones(len(edges), dtype = np.bool_), storage = "csr")
+
+
+def main():
+    sizes = [int(k) for k in sys.argv[1:]] or [30, 45, 70]
+    rng = np.random.default_rng(1)
+
+    for k in sizes:
+        g = jittered_grid(k)
+        numEdges = 4 * k * (k - 1)
+
+        start = time()
+        ch = g.contraction_hierarchy()
+        build = time() - start
+
+        pairs = rng.integers(0, k * k, (50, 2))
+        times = {"ch": 0, "dijkstra": 0, "bidirectional": 0}
+
+        for s, t in pairs:
+            tour, shrDist, duration = ch.query(s, t)
+            times["ch"] += duration
+            times["dijkstra"] += g.dijkstra(s, t)[2]
+            times["bidirectional"] += g.bidirectional_dijkstra(s, t)[2]
+
+            assert np.isclose(shrDist, g.dijkstra(s, t)[1])
+
+        queries = ", ".join(f"{name} {1000 * total / len(pairs):.2f}ms" for name, total in times.items())
+        print(f"k = {k}, n = {k * k}, edges = {numEdges}: build {build:.2f}s, "
+              f"{ch.getNumShortcuts()} shortcuts ({ch.getNumShortcuts() / numEdges:.2f} per edge), queries: {queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark for the blocked Floyd-Warshall.
+
+Runs :code:`cspath.Graph.floyd_warshall_all` on a random graph, first unblocked, then blocked with
+several tile sizes on one thread, then with the given tile size on 1, 2, 4, ... threads up to the
+number of cores, and prints the speed-up of each run and the number of threads it used.
+
+Usage: python benchmarks/floyd_warshall.py [numNodes] [blockSize]
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cspath import Graph
+
+
+def random_graph(numNodes, density = 0.01, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    matrix = np.where(rng.random((numNodes, numNodes)) < density, rng.random((numNodes, numNodes)) + 0.1, np.inf)
+    np.fill_diagonal(matrix, 0)
+
+    return Graph(matrix)
+
+
+def main():
+    numNodes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    blockSize = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    cores = os.cpu_count() or 1
+
+    g = random_graph(numNodes)
+
+    print(f"n = {numNodes}, cores = {cores}")
+
+    M, prev, tour, shrDist, base = g.floyd_warshall_all(blockSize = numNodes)
+    print(f"unblocked, threads = 1: {base:.2f}s")
+
+    for size in (64, 128, 256, 512):
+        if size < numNodes:
+            M2, prev2, tour2, shrDist2, duration = g.floyd_warshall_all(blockSize = size, numThreads = 1)
+
+            assert np.allclose(M, M2)
+            print(f"blockSize = {size}, threads = 1: {duration:.2f}s ({base / duration:.2f}x)")
+
+    threads = 2
+    while threads <= cores:
+        M2, prev2, tour2, shrDist2, duration = g.floyd_warshall_all(blockSize = blockSize, numThreads = threads)
+
+        assert np.allclose(M, M2)
+        print(f"blockSize = {blockSize}, threads = {threads}: {duration:.2f}s ({base / duration:.2f}x)")
+
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
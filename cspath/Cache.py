@@ -0,0 +1,96 @@
+"""A least-recently-used cache of shortest path trees. Not to be used by the user."""
+from collections import OrderedDict
+###############################
+#         TREE CACHE          #
+###############################
+
+class TreeCache:
+    """
+    Keeps the most recently used shortest path trees of a graph within a memory budget.
+    Every entry belongs to one version of the graph: as soon as a lookup is made with a
+    newer version, all entries are dropped.
+
+    Parameters
+    ----------
+
+        maxBytes: int, memory budget for the cached trees
+    """
+    def __init__(self, maxBytes):
+        self.__maxBytes = maxBytes
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__version = None
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__invalidations = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __sync(self, version):
+        if version != self.__version:
+            if self.__entries:
+                self.__invalidations += 1
+            self.clear()
+            self.__version = version
+
+    def get(self, key, version):
+        """
+        Returns the tree cached under key for the given graph version, None if there is none
+        """
+        self.__sync(version)
+
+        tree = self.__entries.get(key)
+        if tree is None:
+            self.__misses += 1
+            return None
+
+        self.__hits += 1
+        self.__entries.move_to_end(key)
+        return tree
+
+    def put(self, key, version, tree):
+        """
+        Caches tree under key for the given graph version, evicting the least recently used trees
+        until it fits. Trees larger than the whole budget are not cached.
+        """
+        self.__sync(version)
+
+        size = tree.getSize()
+        if size > self.__maxBytes:
+            return
+
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.__bytes -= old.getSize()
+
+        while self.__bytes + size > self.__maxBytes:
+            oldKey, oldTree = self.__entries.popitem(last = False)
+            self.__bytes -= oldTree.getSize()
+            self.__evictions += 1
+
+        self.__entries[key] = tree
+        self.__bytes += size
+
+    def clear(self):
+        """
+        Drops all cached trees
+        """
+        self.__entries.clear()
+        self.__bytes = 0
+
+    def stats(self):
+        """
+        Returns a dict with the number of hits, misses, evictions, invalidations and entries,
+        the bytes in use and the budget
+        """
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+            "invalidations": self.__invalidations,
+            "entries": len(self.__entries),
+            "bytes": self.__bytes,
+            "maxBytes": self.__maxBytes,
+        }
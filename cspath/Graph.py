@@ -3,8 +3,19 @@
 #       IMPORTS         #
 #########################
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappush, heappop
 from time import time
+from weakref import ref
 from . import Node as nd
+from .Heap import IndexedHeap
+from .IO import writeGraph, readGraph, readEdgeList
+from .Tree import ShortestPathTree, DynamicShortestPathTree, walk
+from .Cache import TreeCache
+from .CH import ContractionHierarchy
+from .Landmarks import Landmarks
+from .Storage import DenseStorage, CSRStorage, CoordinateStore
 ######################################
 #            GRAPH CLASS             #
 ######################################
@@ -17,25 +28,106 @@ class Graph:
     ----------
     
         distanceMatrix: numpy.array, optional
+        storage: str, optional
+        tolerance: float or int, optional
+        validate: boolean, optional
     
     If no distanceMatrix is given or the distanceMatrix given is invalid, 
-    the distanceMatrix of the class will not be initialized
-    """
-    def __init__(self, distanceMatrix = None):
+    the distanceMatrix of the class will not be initialized. Setting validate to False skips
+    the check of distanceMatrix, for matrices that are known to be valid.
+
+    storage selects how edges are kept in memory. :code:`"dense"` (default) keeps the
+    full distance matrix. :code:`"csr"` keeps only the actual edges in compressed sparse
+    row format, which is what large sparse graphs (e.g. road networks) need.
 
-        self.__distMatrix = np.array([], dtype = np.ndarray)
-        self.__NodeList = None
+    tolerance is used in coordinate mode to decide whether two nodes are the same. With the
+    default of 0 the coordinates must match exactly. Otherwise each coordinate is rounded to
+    the nearest multiple of tolerance and nodes that round to the same point are the same.
+    """
+    def __init__(self, distanceMatrix = None, storage = "dense", tolerance = 0, validate = True):
+
+        if storage not in ("dense", "csr"):
+            raise ValueError(f"Expected 'dense' or 'csr' for storage and got {storage}.")
+
+        if tolerance < 0:
+            raise ValueError(f"Expected a non-negative tolerance and got {tolerance}.")
+
+        self.__storageMode = storage
+        self.__tolerance = np.float64(tolerance)
+        self.__nodeIndex = {}
+        self.__version = 0
+        self.__cache = None
+        self.__dynamicTrees = []
+        self.__reverse = None
+        self.__hierarchy = None
+        self.__storage = DenseStorage(np.zeros((0, 0)))
+        self.__coords = None
         self.__3D = False
         self.__coordinateMode = False
 
         if isinstance(distanceMatrix, np.ndarray):
             
-            if self.checkDistanceMatrix(distanceMatrix):
+            if not validate or self.checkDistanceMatrix(distanceMatrix):
 
-                self.__distMatrix = distanceMatrix
+                self.__storage = self.__makeStorage(distanceMatrix, np.inf)
         else:
-            self.__NodeList = np.array([], dtype = type(nd.Node))
+            self.__coords = CoordinateStore()
             self.__coordinateMode = True
+            self.__storage = self.__makeStorage(np.zeros((0, 0)), -np.inf)
+
+####### Build a coordinate graph from arrays of nodes and edges.
+    @classmethod
+    def from_arrays(cls, coords, edges, undirected_mask = None, storage = "dense", tolerance = 0):
+        """
+        Builds a graph in coordinate mode from all its nodes and edges at once, see
+        :code:`cspath.Graph.add_nodes` and :code:`cspath.Graph.link_many`
+        
+        Parameters
+        ----------
+        
+            coords: numpy.array of shape (n, 3), coordinates of the nodes
+            edges: numpy.array of shape (m, 2), pairs of rows of coords
+            undirected_mask: numpy.array of m booleans, optional
+            storage: str, optional
+            tolerance: float or int, optional
+        
+        Rows of coords with the same coordinates become a single node.
+        
+        Returns
+        -------
+        
+            g: cspath.Graph
+        """
+        g = cls(storage = storage, tolerance = tolerance)
+        ids = g.add_nodes(coords)
+
+        edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+
+        if len(edges) and (edges.min() < 0 or edges.max() >= len(ids)):
+            raise ValueError(f"Every entry of edges must be a row of coords, between 0 and {len(ids) - 1}.")
+
+        g.link_many(ids[edges], undirected_mask)
+
+        return g
+
+####### Wrap a distance matrix in the storage backend chosen at construction.
+    def __makeStorage(self, distanceMatrix, fill):
+        if self.__storageMode == "csr":
+            return CSRStorage.fromDense(distanceMatrix, fill)
+        return DenseStorage(distanceMatrix, fill)
+
+####### The node index is built on first use, so that loading a saved graph does not pay for it.
+    def __getNodeIndex(self):
+        if self.__nodeIndex is None:
+            coordinates = self.__coords.toArray().tolist()
+            self.__nodeIndex = {self.__nodeKey(x, y, z): i for i, (x, y, z) in enumerate(coordinates)}
+        return self.__nodeIndex
+
+####### Hash key of a coordinate triple, used to look nodes up in the node index.
+    def __nodeKey(self, x, y, z):
+        if self.__tolerance == 0:
+            return (float(x), float(y), float(z))
+        return (round(x / self.__tolerance), round(y / self.__tolerance), round(z / self.__tolerance))
 
 ####### Check if given distance matrix is a valid distance Matrix. Depending on 
 ####### errorMode, choose to either raise an error or return false. 
@@ -51,45 +143,155 @@ class Graph:
         
         If errorMode is set to True, then errors will be raised, ending code execution
         Otherwise, the function will return False
+
+        All entries are checked at once and the error lists every invalid entry found.
         
         .. _valid: https://cspath.readthedocs.io/en/latest/how-to/graph-parse.html
         
         """
-        if not isinstance(distanceMatrix[0], np.ndarray):
-            if errorMode:
-                raise ValueError(f"Expected {np.ndarray} and got {type(distanceMatrix[0])}.")
-            else:
-                return False
+        errors = _matrixErrors(distanceMatrix)
 
-        if not isinstance(distanceMatrix[0][0], (np.float64, np.float32, np.int64, np.int32, np.int16, np.int8)):
+        if errors:
             if errorMode:
-                raise ValueError(f"Expected {np.float64} or {np.int64} for matrix entries and got {type(distanceMatrix[0][0])}.")
+                raise ValueError(" ".join(errors))
             else:
                 return False
 
-        matrix_num = len(distanceMatrix) 
+        return True
+
+######################################
+#          SAVING AND LOADING        #
+######################################
+
+####### Save the graph to a binary file.
+    def save(self, path):
+        """
+        Saves the graph to a file in CSPath's binary format, which :code:`cspath.Graph.load` opens without parsing
+        
+        Parameters
+        ----------
+        
+            path: str or path-like
+        
+        The file holds a versioned header followed by the raw arrays of the graph: the distance matrix or
+        the compressed sparse rows, depending on the storage, and the node coordinates in coordinate mode.
+        """
+        meta = {
+            "kind": "graph",
+            "storage": self.__storageMode,
+            "coordinateMode": self.__coordinateMode,
+            "3D": self.__3D,
+            "tolerance": float(self.__tolerance),
+            "fill": float(self.__storage.fill),
+        }
+
+        if self.__storageMode == "csr":
+            indptr, indices, weights = self.__storage.toCSR()
+            arrays = {"indptr": indptr, "indices": indices, "weights": weights}
+        else:
+            arrays = {"matrix": self.__storage.toDense()}
+
+        if self.__coordinateMode:
+            arrays["coordinates"] = self.__coords.toArray()
+
+        writeGraph(path, meta, arrays)
+
+####### Load a graph from a binary file.
+    @classmethod
+    def load(cls, path, mmap = True):
+        """
+        Loads a graph saved with :code:`cspath.Graph.save`
+        
+        Parameters
+        ----------
+        
+            path: str or path-like
+            mmap: boolean, optional
         
-        for i in np.arange(matrix_num):
+        If mmap is True (default), the arrays are memory-mapped instead of read: loading takes the same short
+        time for any graph size, pages are only read when an algorithm touches them, and processes that load the
+        same file share one copy in memory. Changes to the graph are kept in memory and never written to the file.
+        
+        Returns
+        -------
+        
+            g: cspath.Graph
+        """
+        meta, arrays = readGraph(path, mmap)
 
-            for j in np.arange(i, matrix_num):
+        ##### Files saved before the kind was recorded hold graphs too.
+        if meta.get("kind", "graph") != "graph" or "storage" not in meta:
+            raise ValueError(f"{path} does not hold a graph.")
 
-                if i != j:
+        g = cls(storage = meta["storage"], tolerance = meta["tolerance"])
 
-                    if distanceMatrix[i][j] * distanceMatrix[j][i] == 0:
-                        if errorMode:
-                            raise ValueError(f"Zero entry not on main diagonal: ({i, j}, {j, i}) = ({distanceMatrix[i][j]}, {distanceMatrix[j][i]}).")
-                        else:
-                            return False
+        if meta["storage"] == "csr":
+            g.__storage = CSRStorage(arrays["indptr"], arrays["indices"], arrays["weights"], meta["fill"])
+        else:
+            g.__storage = DenseStorage(arrays["matrix"], meta["fill"])
 
-                else:
+        g.__coordinateMode = meta["coordinateMode"]
+        g.__3D = meta["3D"]
+        g.__coords = CoordinateStore(arrays["coordinates"]) if g.__coordinateMode else None
+        g.__nodeIndex = None
 
-                    if distanceMatrix[i][i] != 0:
-                        if errorMode:
-                            raise ValueError(f"'Main' diagonal entry {i, i} is {distanceMatrix[i][i]} (not 0).")
-                        else:
-                            return False
+        return g
 
-        return True
+####### Build a graph from an edge list file.
+    @classmethod
+    def from_edge_list(cls, path, fileFormat = None, delimiter = None, directed = True, storage = "csr", chunkSize = 1000000, header = False):
+        """
+        Builds a graph from a CSV, TSV, DIMACS (.gr) or whitespace-separated text file with one edge per line,
+        without going through a distance matrix
+        
+        Parameters
+        ----------
+        
+            path: str or path-like
+            fileFormat: str, optional, :code:`"csv"`, :code:`"tsv"`, :code:`"dimacs"` or :code:`"text"`
+            delimiter: str, optional
+            directed: boolean, optional
+            storage: str, optional
+            chunkSize: int, optional
+            header: boolean, optional
+        
+        The file is read chunkSize lines at a time and the edges go straight into the storage, so memory
+        use is bounded by the size of the graph rather than that of its distance matrix. See
+        :code:`cspath.IO.readEdgeList` for the file formats. The external node IDs are numbered in order of appearance (DIMACS
+        node i becomes node i - 1). If directed is False, every edge is added in both directions. If an edge
+        appears more than once, the last line wins.
+        
+        Returns
+        -------
+        
+            g: cspath.Graph
+            ids: numpy.array, external ID of every node of g
+            rate: float, edges read per second
+        """
+        if storage not in ("dense", "csr"):
+            raise ValueError(f"Expected 'dense' or 'csr' for storage and got {storage}.")
+
+        start = time()
+
+        src, dst, weights, ids = readEdgeList(path, fileFormat, delimiter, chunkSize, header)
+        numEdges = len(src)
+
+        if not directed:
+            src, dst, weights = np.concatenate((src, dst)), np.concatenate((dst, src)), np.concatenate((weights, weights))
+
+        keep = src != dst
+        edges = CSRStorage()
+        edges.addNodes(len(ids))
+        edges.setMany(src[keep], dst[keep], weights[keep])
+
+        g = cls(storage = storage)
+        g.__coordinateMode = False
+        g.__coords = None
+        g.__storage = edges if storage == "csr" else DenseStorage(edges.toDense())
+
+        end = time()
+
+        return g, ids, numEdges / max(end - start, 1e-9)
 
 ######################################
 #       GETTERS AND SETTERS          #
@@ -110,6 +312,50 @@ class Graph:
             return self.__3D
         return None
 
+    def getVersion(self):
+        """
+        Returns the version of the graph, a counter increased by every change to its nodes or edges
+        """
+        return self.__version
+
+####### Shortest path tree cache.
+    def enableCache(self, maxBytes = 64 * 2 ** 20):
+        """
+        Caches the trees returned by :code:`cspath.Graph.shortest_path_tree`, so that asking again for the
+        tree of the same source and algorithm returns it without a new search
+        
+        Parameters
+        ----------
+        
+            maxBytes: int, optional, memory budget of the cache (64 MiB by default)
+        
+        When the budget is reached, the least recently used trees are dropped. Any change to the graph
+        through its methods (:code:`cspath.Graph.linkNodes`, :code:`cspath.Graph.delLink`, :code:`cspath.Graph.changeNode`,
+        :code:`cspath.Graph.addNode`, :code:`cspath.Graph.setDistanceMatrix`, ...) empties the cache.
+        """
+        self.__cache = TreeCache(maxBytes)
+
+    def disableCache(self):
+        """
+        Drops the shortest path tree cache
+        """
+        self.__cache = None
+
+    def getCacheStats(self):
+        """
+        Returns the hits, misses, evictions, invalidations, entries, bytes and maxBytes of the shortest path
+        tree cache as a dict, None if it is not enabled
+        """
+        if self.__cache is None:
+            return None
+        return self.__cache.stats()
+
+    def getStorageMode(self):
+        """
+        Returns :code:`"dense"` or :code:`"csr"`, depending on how the edges are stored.
+        """
+        return self.__storageMode
+
 ####### Distance Matrix getter, setter and checker.
     def IsValidDistanceMatrix(self, distanceMatrix, errorMode = False):
         """
@@ -117,7 +363,7 @@ class Graph:
         """
         return self.checkDistanceMatrix(distanceMatrix, errorMode)
     
-    def setDistanceMatrix(self, distanceMatrix, errorMode = False):
+    def setDistanceMatrix(self, distanceMatrix, errorMode = False, validate = True):
         """
         Uses checkDistanceMatrix to see if the given distanceMatrix is valid. If so, it sets the 
         current distanceMatrix to the given. Otherwise returns False
@@ -127,30 +373,37 @@ class Graph:
         
             distanceMatrix: numpy.array
             errorMode: boolean, optional
+            validate: boolean, optional, if False the check is skipped
         
         """
-        if self.checkDistanceMatrix(distanceMatrix, errorMode):
-            self.__distMatrix = distanceMatrix
+        if not validate or self.checkDistanceMatrix(distanceMatrix, errorMode):
+            self.__storage = self.__makeStorage(distanceMatrix, np.inf)
+            self.__version += 1
+
+            for tree in self.__liveTrees():
+                tree.rebuild(*self.__storage.toCSR())
+
             return True
         else:
             return False
 
     def getDistanceMatrix(self):
         """
-        Returns current distanceMatrix
+        Returns current distanceMatrix. With :code:`"csr"` storage the matrix is built on request.
+        The result should be treated as read-only; use the setters to change the graph.
         
         Returns
         -------
         
             distanceMatrix: numpy.array
         """
-        return self.__distMatrix
+        return self.__storage.toDense()
 
 ####### Add a node to the Node list. Update distance matrix.
     def addNode(self, x, y, z):
         """
         If we are in coordinate mode, checks if the node with given coordinates is in nodeList. If not, it adds it.
-        Otherwise, returns False
+        Otherwise, returns None. The check is a lookup in a hash index of the coordinates, see :code:`cspath.Graph.findNode`
         
         Parameters
         ----------
@@ -174,26 +427,73 @@ class Graph:
             if nz != 0 and not self.__3D:
                 self.__3D = True
 
-            curr = nd.Node(nx, ny, nz)
-
-            if not nd.nodeInList(curr, self.__NodeList):
-                self.__NodeList = np.append(self.__NodeList, curr)
-                
-                if len(self.__distMatrix) == 0:
-                    self.__distMatrix = np.append(self.__distMatrix, np.array(0))
-                    self.__distMatrix = np.resize(self.__distMatrix, (1, 1))
-                else:
-                    temp = np.resize(-np.inf, (len(self.__NodeList), len(self.__NodeList)))
-                    temp[len(self.__NodeList) - 1][len(self.__NodeList) - 1] = 0
-                    for i in np.arange(len(self.__distMatrix)):
-                        for j in np.arange(len(self.__distMatrix)):
-                            temp[i][j] = self.__distMatrix[i][j]
-                    self.__distMatrix = temp
-
-                return curr
+            key = self.__nodeKey(nx, ny, nz)
+            nodeIndex = self.__getNodeIndex()
+
+            if key not in nodeIndex:
+                numNodes = self.__coords.append([nx, ny, nz])
+
+                nodeIndex[key] = numNodes
+                self.__storage.addNode()
+                self.__version += 1
+
+                for tree in self.__liveTrees():
+                    tree.addNodes(1)
+
+                return nd.Node.fromStore(self.__coords, numNodes, self)
             else:
                 return None
     
+####### Add many nodes at once.
+    def add_nodes(self, coords):
+        """
+        Adds a node for every row of coords in coordinate mode. Like :code:`cspath.Graph.addNode`,
+        coordinates that already belong to a node are skipped, but the storage grows only once.
+        
+        Parameters
+        ----------
+        
+            coords: numpy.array of shape (n, 3)
+        
+        Returns
+        -------
+        
+            ids: numpy.array, index of the node at each row of coords, whether new or existing
+        """
+        if not self.__coordinateMode:
+            return None
+
+        coords = np.asarray(coords, dtype = np.float64).reshape(-1, 3)
+
+        numNodes = len(self.__coords)
+        ids = np.empty(len(coords), dtype = np.int64)
+        nodeIndex = self.__getNodeIndex()
+        new = []
+
+        for row, (x, y, z) in enumerate(coords.tolist()):
+            key = self.__nodeKey(x, y, z)
+            node = nodeIndex.get(key)
+
+            if node is None:
+                node = numNodes + len(new)
+                nodeIndex[key] = node
+                new.append(row)
+
+            ids[row] = node
+
+        if new:
+            self.__coords.append(coords[new])
+            self.__storage.addNodes(len(new))
+            self.__version += 1
+
+            for tree in self.__liveTrees():
+                tree.addNodes(len(new))
+
+        if np.any(coords[:, 2] != 0):
+            self.__3D = True
+
+        return ids
+
 ####### Change the coordinates of an existing node.
     def changeNode(self, i, x, y, z):
         """
@@ -214,29 +514,86 @@ class Graph:
             ny = np.float64(y)
             nz = np.float64(z)
 
-            if ni < len(self.__NodeList):
-                if not nd.nodeInList(nd.Node(nx, ny, nz), self.__NodeList):
-                    self.__NodeList[ni].setNode(nx, ny, nz)
+            if ni < len(self.__coords):
+                key = self.__nodeKey(nx, ny, nz)
+                nodeIndex = self.__getNodeIndex()
+
+                if key not in nodeIndex:
+                    ni = int(ni)
+                    coordinates = self.__coords.toArray()
+
+                    del nodeIndex[self.__nodeKey(*coordinates[ni])]
+                    nodeIndex[key] = ni
+                    coordinates[ni] = (nx, ny, nz)
+                    self.__version += 1
+
+                    ##### All edge weights of the node are recomputed in one pass per direction.
+                    outs = self.get_oneighbors(ni)
+                    for i, t in zip(outs, np.linalg.norm(coordinates[outs] - coordinates[ni], axis = 1)):
+                        self.__setEdge(ni, int(i), t)
+
+                    ins = self.get_ineighbors(ni)
+                    for i, t in zip(ins, np.linalg.norm(coordinates[ins] - coordinates[ni], axis = 1)):
+                        self.__setEdge(int(i), ni, t)
+
+####### Look a node up by its coordinates.
+    def findNode(self, x, y, z):
+        """
+        Finds the node with coordinates x, y, z (up to the tolerance given at construction) in constant time
+        
+        Parameters
+        ----------
+        
+            x: float or int
+            y: float or int
+            z: float or int
+        
+        Returns
+        -------
+        
+            i: int, index of the Node in the list, or None if there is no such node
+        """
+        if self.__coordinateMode:
+            return self.__getNodeIndex().get(self.__nodeKey(np.float64(x), np.float64(y), np.float64(z)))
 
-                    for i in np.arange(len(self.__distMatrix)):
-                        t = np.linalg.norm(self.__NodeList[ni].get() - self.__NodeList[i].get())
-                        if self.__distMatrix[ni][i] > 0:
-                            self.__distMatrix[ni][i] = t 
-                        if self.__distMatrix[i][ni] > 0:
-                            self.__distMatrix[ni][i] = t
+        return None
 
 ####### Return the list of current nodes.
     def getNodeList(self):
         """
-        Returns the nodeList
+        Returns the nodeList. Its nodes are handles to the coordinates kept by the graph,
+        see :code:`cspath.Graph.getCoordinates`
         
         Returns
         -------
             
-            cspath.Graph.__NodeList: numpy.array of cspath.Node types
+            nodeList: numpy.array of cspath.Node types
+        
+        """
+        if self.__coords is None:
+            return None
+
+        nodeList = np.empty(len(self.__coords), dtype = object)
+        for i in range(len(nodeList)):
+            nodeList[i] = nd.Node.fromStore(self.__coords, i, self)
+
+        return nodeList
+
+####### Return the coordinates of all nodes.
+    def getCoordinates(self):
+        """
+        Returns the coordinates of all nodes in coordinate mode, None otherwise.
+        The result is a view and should be treated as read-only; use :code:`cspath.Graph.changeNode` to move a node.
         
+        Returns
+        -------
+        
+            coordinates: numpy.array of shape (n, 3), row i holds the coordinates of node i
         """
-        return self.__NodeList
+        if self.__coords is None:
+            return None
+
+        return self.__coords.toArray()
 
 ######################################
 #        LINKING NODES               #
@@ -258,13 +615,82 @@ class Graph:
         ni = np.uint64(i)
         nj = np.uint64(j)
 
-        if ni != nj and ni < len(self.__NodeList) and nj < len(self.__NodeList) and isinstance(sdirect, bool):
-            dist = np.linalg.norm(self.__NodeList[ni].get() - self.__NodeList[nj].get())
+        if ni != nj and ni < len(self.__coords) and nj < len(self.__coords) and isinstance(sdirect, bool):
+            coordinates = self.__coords.toArray()
+            dist = np.linalg.norm(coordinates[ni] - coordinates[nj])
 
-            self.__distMatrix[ni][nj] = dist
+            self.__setEdge(int(ni), int(nj), dist)
             if sdirect:
-                self.__distMatrix[nj][ni] = dist
+                self.__setEdge(int(nj), int(ni), dist)
+
+            self.__version += 1
     
+####### Change one edge, keeping the dynamic shortest path trees up to date. A weight of None removes the edge.
+    def __setEdge(self, i, j, w):
+        if w is None:
+            self.__storage.remove(i, j)
+        else:
+            self.__storage.set(i, j, w)
+
+        for tree in self.__liveTrees():
+            tree.setEdge(i, j, w)
+
+####### The dynamic shortest path trees that are still in use.
+    def __liveTrees(self):
+        trees = [(r, r()) for r in self.__dynamicTrees]
+        self.__dynamicTrees = [r for r, tree in trees if tree is not None]
+        return [tree for r, tree in trees if tree is not None]
+
+####### Create many links at once.
+    def link_many(self, edges, undirected_mask = None):
+        """
+        Adds many edges at once. Like :code:`cspath.Graph.linkNodes`, each edge is weighted by the euclidean
+        distance between its nodes, but all weights are computed and stored in one vectorized pass.
+        
+        Parameters
+        ----------
+        
+            edges: numpy.array of shape (m, 2), pairs (i, j) of node indices
+            undirected_mask: numpy.array of m booleans, optional
+        
+        Edge k goes from node edges[k][0] to node edges[k][1]. Where undirected_mask is True, the edge is
+        undirected, like sdirect = True in :code:`cspath.Graph.linkNodes`. By default all edges are directed.
+        Edges from a node to itself are ignored.
+        """
+        if not self.__coordinateMode:
+            return
+
+        edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+        numNodes = len(self.__coords)
+
+        if len(edges) and (edges.min() < 0 or edges.max() >= numNodes):
+            raise ValueError(f"Every node of edges must be between 0 and {numNodes - 1}.")
+
+        if undirected_mask is None:
+            undirected_mask = np.zeros(len(edges), dtype = np.bool_)
+        else:
+            undirected_mask = np.asarray(undirected_mask, dtype = np.bool_)
+
+            if undirected_mask.shape != (len(edges),):
+                raise ValueError(f"Expected {len(edges)} entries for undirected_mask and got {undirected_mask.shape}.")
+
+        keep = edges[:, 0] != edges[:, 1]
+        src, dst, undirected = edges[keep, 0], edges[keep, 1], undirected_mask[keep]
+
+        coordinates = self.__coords.toArray()
+        dist = np.linalg.norm(coordinates[src] - coordinates[dst], axis = 1)
+
+        self.__storage.setMany(np.concatenate((src, dst[undirected])),
+                               np.concatenate((dst, src[undirected])),
+                               np.concatenate((dist, dist[undirected])))
+        self.__version += 1
+
+        for tree in self.__liveTrees():
+            for i, j, w in zip(src.tolist(), dst.tolist(), dist.tolist()):
+                tree.setEdge(i, j, w)
+            for i, j, w in zip(dst[undirected].tolist(), src[undirected].tolist(), dist[undirected].tolist()):
+                tree.setEdge(i, j, w)
+
 ####### Delete a link between two specified nodes.
     def delLink(self, i, j, sdirect):
         """
@@ -281,20 +707,56 @@ class Graph:
         ni = np.uint64(i)
         nj = np.uint64(j)
 
-        if ni != nj and ni < len(self.__NodeList) and nj < len(self.__NodeList) and isinstance(sdirect, bool):
+        if ni != nj and ni < len(self.__coords) and nj < len(self.__coords) and isinstance(sdirect, bool):
 
-            self.__distMatrix[ni][nj] = -np.inf
+            self.__setEdge(int(ni), int(nj), None)
             if sdirect:
-                self.__distMatrix[nj][ni] = -np.inf
+                self.__setEdge(int(nj), int(ni), None)
+
+            self.__version += 1
         
 ######################################
 #       ALGORITHM IMPLEMENTATION     #
 ######################################
 
-####### Dijkstra's Algorithm Implementation Version 1 (Without using heaps).
-    def dijkstra(self):
+####### Resolve the start and end nodes of a query. The end nodes default to the last node.
+    def __endpoints(self, source, target, targets):
+        numNodes = len(self.__storage)
+
+        if targets is None:
+            goals = [numNodes - 1 if target is None else target]
+        else:
+            goals = list(targets)
+
+        for node in [source] + goals:
+            if not 0 <= node < numNodes:
+                raise ValueError(f"Node {node} does not exist; the graph has {numNodes} nodes.")
+
+        return int(source), [int(node) for node in goals], targets is not None
+
+####### Dijkstra's Algorithm Implementation Version 1 (Binary heap, or a linear scan on request).
+    def dijkstra(self, source = 0, target = None, targets = None, engine = "auto"):
         """
         Standard implementation of Dijkstra's algorithm. More information can be found `here`_.
+
+        Parameters
+        ----------
+            source: int, optional
+            target: int, optional
+            targets: list of int, optional
+            engine: str, optional
+
+        The path is computed from node source (the first node by default) to node target (the last node
+        by default). If a list of targets is given instead, the search stops as soon as all of them are
+        reached, tour is a list with one path per target (None if it cannot be reached) and shrDist is a
+        :code:`numpy.array` of their lengths.
+
+        engine selects how the next node is found. :code:`"heap"` uses a binary heap and runs in
+        :math:`O((V + E) log V)`. :code:`"scan"` scans all unvisited nodes, :math:`O(V^2)`. :code:`"dense"`
+        works on the rows of the distance matrix with whole-row NumPy operations, also :math:`O(V^2)` but
+        with small constants, which is fastest for graphs with many edges. :code:`"auto"` (default) picks
+        :code:`"dense"` for :code:`"dense"` storage when at least a quarter of all node pairs are linked,
+        and :code:`"heap"` otherwise.
         
         Returns
         -------
@@ -304,86 +766,73 @@ class Graph:
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
         """
-        start = time()
-
-        numNodes = len(self.__distMatrix)
-
-        if numNodes == 0:
+        if len(self.__storage) == 0:
             return None, None, None
 
-        shr = np.array([],  dtype = np.float64)
-
-        prev = np.array([], dtype = np.uint64)
-        
-        vis  = np.array([], dtype = np.bool)
-
-        for i in np.arange( numNodes):
-
-            if self.__distMatrix[0][i] >= 0:
-                prev = np.insert(prev, i, 0)
-                shr  = np.insert(shr, i, self.__distMatrix[0][i])
-            else:
-                prev = np.insert(prev, i,  -1)
-                shr  = np.insert(shr, i, np.inf)
+        shr, prev, tour, shrDist, duration = self.dijkstra_all(source, target, targets, engine)
 
-            vis = np.insert(vis, i, False)
-        
-        vis[0] = True
-        numTrue = 1
+        return tour, shrDist, duration
 
-        while numTrue < numNodes:
+####### Bidirectional Dijkstra's Algorithm Implementation (Searches from both ends of the path at once).
+    def bidirectional_dijkstra(self, source = 0, target = None):
+        """
+        Dijkstra's algorithm run from both ends of the path at once. More information can be found `here`_.
 
-            min_idx = 1 
+        Parameters
+        ----------
+            source: int, optional
+            target: int, optional
 
-            for j in np.arange(1, numNodes):
+        The path is computed from node source (the first node by default) to node target (the last node by default).
 
-                if not vis[j]:
-                    min_idx = j
-                    break
-            
-            for i in np.arange(numNodes):
-                
-                if shr[i] < shr[min_idx] and not vis[i]:
-                    min_idx = i
-            
-            for h in np.arange(numNodes):
+        One search goes forward from source over the out-edges and the other backward from target over
+        the in-edges, always advancing the one with the closer frontier. Every edge that joins the two
+        searches gives a candidate path, and the search stops once the two frontiers together are at
+        least as long as the best candidate. On large graphs this settles far fewer nodes than
+        :code:`cspath.Graph.dijkstra`, which grows a single ball around source until target is reached.
+        
+        Returns
+        -------
+            tour: numpy.array containing shortest path
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if len(self.__storage) == 0:
+            return None, None, None
 
-                if vis[h]:
-                    continue
+        start = time()
 
-                if self.__distMatrix[min_idx][h] > 0 and self.__distMatrix[min_idx][h] + shr[min_idx] < shr[h]:
-                    shr[h] = self.__distMatrix[min_idx][h] + shr[min_idx]
-                    prev[h] = min_idx
-        
-            
-            if min_idx == numNodes - 1:
-                break
+        source, goals, multi = self.__endpoints(source, target, None)
+        target = goals[0]
 
-            vis[min_idx] = True
-            numTrue += 1
+        shrDist, meet, prev, succ = _bidirectional_dijkstra(self.__storage.toCSR(), self.__reverseCSR(), source, target)
 
         end = time()
 
-        if shr[numNodes - 1] == np.inf:
+        if meet == -1:
             return None, None, end - start
 
-        tour = np.array([numNodes - 1], dtype = np.uint64)
-        g = prev[numNodes - 1]
-
-        while g:
+        tour = np.concatenate((walk(prev, source, meet), walk(succ, target, meet)[-2::-1]))
 
-            tour = np.append(tour, g)
-            g = prev[g]
+        return tour, shrDist, end - start
 
-        tour = np.append(tour, 0)
-        tour = np.flip(tour)
+####### The edges of the graph reversed, in compressed sparse rows. Kept until the graph changes.
+    def __reverseCSR(self):
+        if self.__reverse is None or self.__reverse[0] != self.__version:
+            self.__reverse = (self.__version, _transpose_csr(*self.__storage.toCSR()))
 
-        return tour, shr[numNodes - 1], end - start
+        return self.__reverse[1]
 
 ####### Dijkstra's Algorithm Implementation Version 2 (Making use of an indexed priority queue).
-    def ipq_dijkstra(self):
+    def ipq_dijkstra(self, source = 0, target = None, targets = None):
         """
         Indexed Priority Queue implementation of Dijkstra's algorithm. More information can be found `here`_.
+
+        Parameters
+        ----------
+            source, target, targets: optional, see :code:`cspath.Graph.dijkstra`
         
         Returns
         -------
@@ -393,81 +842,81 @@ class Graph:
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
         """
-        try:
-            from pqdict import pqdict
-
-            start = time()
-
-            numNodes = len(self.__distMatrix)
-
-            if numNodes == 0:
-                return None, None, None
-
-            vis = np.array([], dtype = np.bool)
-            shr = np.array([], dtype = np.float64)
-            prev = np.array([], dtype = np.int64)
-            ipq = pqdict({0 : 0})
+        if len(self.__storage) == 0:
+            return None, None, None
 
-            for i in np.arange(numNodes):
-                vis = np.insert(vis, i, False)
-                shr = np.insert(shr, i, np.inf)
-                prev = np.insert(prev, i, -1)
+        shr, prev, tour, shrDist, duration = self.ipq_dijkstra_all(source, target, targets)
 
-            shr[0] = 0
+        return tour, shrDist, duration
 
-            while len(ipq):
+####### Dijkstra's Algorithm Implementation Version 3 (Returns shortest distances from start node to all other nodes and previous vertices).
 
-                index, minValue = ipq.popitem()
-                vis[index] = True
+    def dijkstra_all(self, source = 0, target = None, targets = None, engine = "auto"):
+        """
+        Standard implementation of Dijkstra's algorithm with extra outputs. More information can be found `here`_.
 
-                if shr[index] < minValue:
-                    continue
-                
-                for i in np.arange(numNodes):
-                    
-                    if vis[i]:
-                        continue
+        Parameters
+        ----------
+            source, target, targets, engine: optional, see :code:`cspath.Graph.dijkstra`
+        
+        Returns
+        -------
+            shr: numpy.array containing shortest distances to all nodes from start node
+            tour: numpy.array containing shortest path
+            prev: numpy.array containing previously visited nodes
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
+        
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """        
+        start = time()
 
-                    if self.__distMatrix[index][i] > 0 and self.__distMatrix[index][i] + shr[index] < shr[i]:
-                        shr[i] = self.__distMatrix[index][i] + shr[index]
-                        prev[i] = index
+        numNodes = len(self.__storage)
 
-                        ##### This is a very ugly hack, lol. 
-                        try:
-                            ipq.additem(i, shr[i])
-                        except KeyError:
-                            ipq.updateitem(i, shr[i])
-                
-                if index == numNodes - 1:
-                    break
+        if numNodes == 0:
+            return None, None, None, None, None
 
-            end = time()
+        source, goals, multi = self.__endpoints(source, target, targets)
 
-            if shr[numNodes - 1] == np.inf:
-                return None, None, end - start
+        search = self.__dijkstraSearch(engine)
+        shr, prev = search(source, goals, None)
 
-            tour = np.array([numNodes - 1], dtype = np.uint64)
-            g = prev[numNodes - 1]
+        end = time()
 
-            while g:
+        tour, shrDist = _result(shr, goals, multi, lambda t: _tour(prev, source, t))
 
-                tour = np.append(tour, g)
-                g = prev[g]
+        return shr, prev, tour, shrDist, end - start
 
-            tour = np.append(tour, 0)
-            tour = np.flip(tour)
+####### Pick the Dijkstra kernel of an engine. The result is called as search(source, targets, buffers).
+    def __dijkstraSearch(self, engine):
+        if engine == "auto":
+            numNodes = len(self.__storage)
+            dense = self.__storageMode == "dense" and self.__storage.numEdges() >= _DENSE_DIJKSTRA_DENSITY * numNodes * (numNodes - 1)
+            engine = "dense" if dense else "heap"
 
-            return tour, shr[numNodes - 1], end - start
+        if engine == "dense":
+            matrix = self.__storage.toDense()
+            return lambda source, targets, buffers: _dense_dijkstra(matrix, source, targets, buffers)
 
-        except ImportError:
-            print("Please install module 'pqdict' for this function to work. ^_^")
-            print("More information on 'pqdict' can be found here https://pypi.org/project/pqdict/.")
+        if engine == "heap":
+            kernel = _heap_dijkstra
+        elif engine == "scan":
+            kernel = _scan_dijkstra
+        else:
+            raise ValueError(f"Expected 'auto', 'heap', 'scan' or 'dense' for engine and got {engine}.")
 
-####### Dijkstra's Algorithm Implementation Version 3 (Returns shortest distances from start node to all other nodes and previous vertices without heaps).
+        indptr, indices, weights = self.__storage.toCSR()
+        return lambda source, targets, buffers: kernel(indptr, indices, weights, source, targets, buffers)
 
-    def dijkstra_all(self):
+####### Dijkstra's Algorithm Implementation Version 4 (Returns shortest distances from start node to all other nodes and previous vertices using an indexed priority queue).
+    def ipq_dijkstra_all(self, source = 0, target = None, targets = None):
         """
-        Standard implementation of Dijkstra's algorithm with extra outputs. More information can be found `here`_.
+        Indexed Priority Queue implementation of Dijkstra's algorithm with extra outputs. More information can be found `here`_.
+
+        Parameters
+        ----------
+            source, target, targets: optional, see :code:`cspath.Graph.dijkstra`
         
         Returns
         -------
@@ -479,175 +928,303 @@ class Graph:
         
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
-        """        
+        """       
+
         start = time()
 
-        numNodes = len(self.__distMatrix)
+        numNodes = len(self.__storage)
 
         if numNodes == 0:
             return None, None, None, None, None
 
-        shr = np.array([],  dtype = np.float64)
+        source, goals, multi = self.__endpoints(source, target, targets)
+        pending = set(goals)
 
-        prev = np.array([], dtype = np.uint64)
-        
-        vis  = np.array([], dtype = np.bool)
+        indptr, indices, weights = self.__storage.toCSR()
 
-        for i in np.arange( numNodes):
+        vis = np.zeros(numNodes, dtype = np.bool_)
+        shr = np.full(numNodes, np.inf)
+        prev = np.full(numNodes, -1, dtype = np.int64)
+        ipq = IndexedHeap(numNodes)
+        ipq.push(source, 0)
 
-            if self.__distMatrix[0][i] >= 0:
-                prev = np.insert(prev, i, 0)
-                shr  = np.insert(shr, i, self.__distMatrix[0][i])
-            else:
-                prev = np.insert(prev, i,  -1)
-                shr  = np.insert(shr, i, np.inf)
+        shr[source] = 0
+        prev[source] = source
 
-            vis = np.insert(vis, i, False)
-        
-        vis[0] = True
-        numTrue = 1
+        while len(ipq):
 
-        while numTrue < numNodes:
+            index, minValue = ipq.pop()
+            vis[index] = True
 
-            min_idx = 1 
+            pending.discard(index)
+            if not pending:
+                break
 
-            for j in np.arange(1, numNodes):
+            ##### Queued nodes are lowered in place, so every pop is final.
+            lo, hi = indptr[index], indptr[index + 1]
+            neighs = indices[lo:hi]
+            cand = minValue + weights[lo:hi]
+            better = (weights[lo:hi] >= 0) & (cand < shr[neighs]) & ~vis[neighs]
 
-                if not vis[j]:
-                    min_idx = j
-                    break
-            
-            for i in np.arange(numNodes):
-                
-                if shr[i] < shr[min_idx] and not vis[i]:
-                    min_idx = i
-            
-            for h in np.arange(numNodes):
+            shr[neighs[better]] = cand[better]
+            prev[neighs[better]] = index
 
-                if vis[h]:
-                    continue
-
-                if self.__distMatrix[min_idx][h] > 0 and self.__distMatrix[min_idx][h] + shr[min_idx] < shr[h]:
-                    shr[h] = self.__distMatrix[min_idx][h] + shr[min_idx]
-                    prev[h] = min_idx
+            for i, c in zip(neighs[better].tolist(), cand[better].tolist()):
+                ipq.push(i, c)
         
-            
-            if min_idx == numNodes - 1:
-                break
+        end = time()
+
+        tour, shrDist = _result(shr, goals, multi, lambda t: _tour(prev, source, t))
+
+        return shr, prev, tour, shrDist, end - start
+
+####### Many shortest paths at once.
+    def batch_shortest_paths(self, pairs, engine = "auto"):
+        """
+        Computes the shortest paths of many (source, target) pairs with Dijkstra's algorithm.
+        More information can be found `here`_.
+
+        Parameters
+        ----------
+            pairs: numpy.array or list of (source, target) pairs
+            engine: str, optional, see :code:`cspath.Graph.dijkstra`
+
+        The pairs are grouped by source and a single search is run per distinct source, stopping once all of
+        its targets are reached. The work arrays are allocated once and reused by every search.
+
+        Returns
+        -------
+            tours: list of numpy.array, the shortest path of each pair (None if the target cannot be reached)
+            shrDists: numpy.array, length of each path (inf if the target cannot be reached)
+            duration: float or int, algorithm runtime in seconds
+
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        numNodes = len(self.__storage)
+
+        if numNodes == 0:
+            return None, None, None
+
+        search = self.__dijkstraSearch(engine)
+
+        pairs = np.asarray(pairs, dtype = np.int64).reshape(-1, 2)
+
+        if len(pairs) and (pairs.min() < 0 or pairs.max() >= numNodes):
+            raise ValueError(f"Every node of pairs must be between 0 and {numNodes - 1}.")
+
+        start = time()
 
-            vis[min_idx] = True
-            numTrue += 1
+        buffers = (np.empty(numNodes), np.empty(numNodes, dtype = np.int64), np.empty(numNodes, dtype = np.bool_))
+        shr, prev = buffers[0], buffers[1]
+
+        tours = [None] * len(pairs)
+        shrDists = np.full(len(pairs), np.inf)
+
+        ##### Sorting by source puts the queries of each source next to each other.
+        order = np.argsort(pairs[:, 0], kind = "stable")
+        sources, first = np.unique(pairs[order, 0], return_index = True)
+
+        for source, group in zip(sources.tolist(), np.split(order, first[1:])):
+
+            targets = pairs[group, 1]
+            search(source, targets.tolist(), buffers)
+
+            shrDists[group] = shr[targets]
+
+            for query, target in zip(group.tolist(), targets.tolist()):
+                if shr[target] != np.inf:
+                    tours[query] = _tour(prev, source, target)
 
         end = time()
 
-        if shr[numNodes - 1] == np.inf:
-            return shr, prev, None, None, end - start
+        return tours, shrDists, end - start
 
-        tour = np.array([numNodes - 1], dtype = np.uint64)
-        g = prev[numNodes - 1]
+####### All shortest paths from one node.
+    def shortest_path_tree(self, source = 0, algorithm = "dijkstra"):
+        """
+        Computes the shortest paths from source to every node. More information can be found `here`_.
 
-        while g:
+        Parameters
+        ----------
+            source: int, optional
+            algorithm: str, optional, :code:`"dijkstra"` (default), :code:`"bellman_ford"` or :code:`"spfa"`
 
-            tour = np.append(tour, g)
-            g = prev[g]
+        Unlike :code:`cspath.Graph.dijkstra_all`, the search does not stop at any target, and no path is built
+        until it is asked for. If the cache is enabled (see :code:`cspath.Graph.enableCache`), the tree is looked up there first. Use :code:`"bellman_ford"` or :code:`"spfa"` for graphs with negative edges;
+        a ValueError is raised if they find a negative cycle.
 
-        tour = np.append(tour, 0)
-        tour = np.flip(tour)
+        Returns
+        -------
+            tree: cspath.Tree.ShortestPathTree
 
-        return shr, prev, tour, shr[numNodes - 1], end - start
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if len(self.__storage) == 0:
+            return None
 
-####### Dijkstra's Algorithm Implementation Version 4 (Returns shortest distances from start node to all other nodes and previous vertices using an indexed priority queue).
-    def ipq_dijkstra_all(self):
+        source, goals, multi = self.__endpoints(source, None, None)
+
+        if self.__cache is not None:
+            tree = self.__cache.get((algorithm, source), self.__version)
+            if tree is not None:
+                return tree
+
+        indptr, indices, weights = self.__storage.toCSR()
+        cycle = None
+
+        if algorithm == "dijkstra":
+            shr, prev = _heap_dijkstra(indptr, indices, weights, source)
+        elif algorithm == "bellman_ford":
+            shr, prev, cycle = _bellman_ford(indptr, indices, weights, source)
+        elif algorithm == "spfa":
+            shr, prev, cycle = _spfa(indptr, indices, weights, source)
+        else:
+            raise ValueError(f"Expected 'dijkstra', 'bellman_ford' or 'spfa' for algorithm and got {algorithm}.")
+
+        if cycle is not None:
+            raise ValueError(f"Detected Negative Cycle: {cycle}.")
+
+        tree = ShortestPathTree(source, shr, prev)
+
+        if self.__cache is not None:
+            self.__cache.put((algorithm, source), self.__version, tree)
+
+        return tree
+
+####### Shortest path tree that follows changes to the graph.
+    def dynamic_tree(self, source = 0):
         """
-        Indexed Priority Queue implementation of Dijkstra's algorithm with extra outputs. More information can be found `here`_.
-        
+        Computes the shortest paths from source to every node and keeps them up to date as the graph changes.
+        More information can be found `here`_.
+
+        Parameters
+        ----------
+            source: int, optional
+
+        The returned tree is a :code:`cspath.ShortestPathTree` that is repaired after every change made through
+        :code:`cspath.Graph.linkNodes`, :code:`cspath.Graph.delLink`, :code:`cspath.Graph.changeNode` and
+        :code:`cspath.Graph.link_many`. Each repair only searches the part of the tree affected by the change,
+        see :code:`cspath.Tree.DynamicShortestPathTree`. Edges with negative weight are ignored, as in Dijkstra's algorithm.
+        The graph stops updating the tree once it is no longer referenced.
+
         Returns
         -------
-            shr: numpy.array containing shortest distances to all nodes from start node
-            tour: numpy.array containing shortest path
-            prev: numpy.array containing previously visited nodes
-            shrDist: float or int, length of tour
-            duration: float or int, algorithm runtime in seconds
-        
-        
+            tree: cspath.Tree.DynamicShortestPathTree
+
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
-        """       
+        """
+        if len(self.__storage) == 0:
+            return None
 
-        try:
-            from pqdict import pqdict
+        source, goals, multi = self.__endpoints(source, None, None)
 
-            start = time()
+        tree = DynamicShortestPathTree(source, *self.__storage.toCSR())
+        self.__dynamicTrees.append(ref(tree))
 
-            numNodes = len(self.__distMatrix)
+        return tree
 
-            if numNodes == 0:
-                return None, None, None, None, None
+####### Contraction Hierarchy for fast repeated point-to-point queries.
+    def contraction_hierarchy(self):
+        """
+        Preprocesses the graph into a Contraction Hierarchy, which answers point-to-point queries
+        much faster than a search over the whole graph. More information can be found `here`_.
 
-            vis = np.array([], dtype = np.bool)
-            shr = np.array([], dtype = np.float64)
-            prev = np.array([], dtype = np.int64)
-            ipq = pqdict({0 : 0})
+        The hierarchy adds shortcut edges to the graph so that every shortest path can be found by two
+        small searches that only go "upwards", see :code:`cspath.CH.ContractionHierarchy`. Preprocessing
+        takes a while, so it pays off when many queries are run on a graph that does not change. The
+        graph keeps the last hierarchy and returns it again until it is changed. Hierarchies can be
+        saved with their :code:`save` method and opened with :code:`cspath.ContractionHierarchy.load`.
 
-            for i in np.arange(numNodes):
-                vis = np.insert(vis, i, False)
-                shr = np.insert(shr, i, np.inf)
-                prev = np.insert(prev, i, -1)
+        Returns
+        -------
+            ch: cspath.CH.ContractionHierarchy, whose :code:`query(source, target)` returns
+            (tour, shrDist, duration) like :code:`cspath.Graph.dijkstra`
 
-            shr[0] = 0
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if self.__hierarchy is None or self.__hierarchy[0] != self.__version:
+            self.__hierarchy = (self.__version, ContractionHierarchy.build(*self.__storage.toCSR()))
 
-            while len(ipq):
+        return self.__hierarchy[1]
 
-                index, minValue = ipq.popitem()
-                vis[index] = True
+####### Landmarks for the ALT heuristic of A*.
+    def landmarks(self, k = 8, strategy = "farthest", seed = 0):
+        """
+        Selects k landmark nodes and computes the distances from and to each of them, for the ALT
+        heuristic of :code:`cspath.Graph.a_star`. More information can be found `here`_.
 
-                if shr[index] < minValue:
-                    continue
-                
-                for i in np.arange(numNodes):
-                    
-                    if vis[i]:
-                        continue
+        Parameters
+        ----------
+            k: int, optional
+            strategy: str, optional
+            seed: int, optional
 
-                    if self.__distMatrix[index][i] > 0 and self.__distMatrix[index][i] + shr[index] < shr[i]:
-                        shr[i] = self.__distMatrix[index][i] + shr[index]
-                        prev[i] = index
+        Good landmarks lie "behind" the nodes, on the outskirts of the graph. With :code:`"farthest"`
+        (default), each new landmark is the node farthest from the landmarks already chosen, the first
+        one being the farthest from a random node. With :code:`"avoid"`, a shortest path tree is grown from
+        a random node and the new landmark is the leaf of the branch whose nodes are worst served by the
+        landmarks already chosen, which usually gives tighter bounds. seed fixes the random nodes.
 
-                        ##### This is a very ugly hack, lol. 
-                        try:
-                            ipq.additem(i, shr[i])
-                        except KeyError:
-                            ipq.updateitem(i, shr[i])
-                
-                if index == numNodes - 1:
-                    break
-            prev[0] = 0
-            
-            end = time()
+        Computing the landmarks takes two full searches per landmark. The result does not depend on the
+        query and can be passed as heuristic to any number of :code:`cspath.Graph.a_star` calls, and saved
+        with its :code:`save` method and opened with :code:`cspath.Landmarks.load`.
+
+        Returns
+        -------
+            landmarks: cspath.Landmarks.Landmarks
 
-            if shr[numNodes - 1] == np.inf:
-                return shr, prev, None, None, end - start
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if strategy not in ("farthest", "avoid"):
+            raise ValueError(f"Expected 'farthest' or 'avoid' for strategy and got {strategy}.")
 
-            tour = np.array([numNodes - 1], dtype = np.uint64)
-            g = prev[numNodes - 1]
+        numNodes = len(self.__storage)
+        k = min(int(k), numNodes)
 
-            while g:
+        forward, backward = self.__storage.toCSR(), self.__reverseCSR()
+        rng = np.random.default_rng(seed)
 
-                tour = np.append(tour, g)
-                g = prev[g]
+        nodes = []
+        fromLandmarks = np.empty((k, numNodes))
+        toLandmarks = np.empty((k, numNodes))
 
-            tour = np.append(tour, 0)
-            tour = np.flip(tour)
+        for i in range(k):
+            node = -1
+            if strategy == "avoid":
+                node = _avoid_landmark(forward, Landmarks(np.array(nodes, dtype = np.int64), fromLandmarks[:i], toLandmarks[:i]), rng)
+            if node == -1:
+                node = _farthest_landmark(forward, fromLandmarks[:i], toLandmarks[:i], nodes, rng)
 
-            return shr, prev, tour, shr[numNodes - 1], end - start
+            nodes.append(node)
+            fromLandmarks[i] = _heap_dijkstra(*forward, node)[0]
+            toLandmarks[i] = _heap_dijkstra(*backward, node)[0]
 
-        except ImportError:
-            print("Please install module 'pqdict' for this function to work. ^_^")
-            print("More information on 'pqdict' can be found here https://pypi.org/project/pqdict/.")
+        return Landmarks(np.array(nodes, dtype = np.int64), fromLandmarks, toLandmarks)
 
 ####### A* Algorithm Implementation.
-    def a_star(self):
+    def a_star(self, source = 0, target = None, heuristic = "euclidean", coordinates = None):
         """
-        Standard implementation of A* Algorithm. More information can be found `here`_.
+        Implementation of A* Algorithm with a binary heap. More information can be found `here`_.
+
+        Parameters
+        ----------
+            source: int, optional
+            target: int, optional
+            heuristic: str, callable or numpy.array, optional
+            coordinates: numpy.array, optional
+
+        The path is computed from node source (the first node by default) to node target (the last node by default).
+
+        heuristic estimates the remaining distance from a node to the end node. It can be one of
+        :code:`"euclidean"` (default), :code:`"manhattan"`, :code:`"chebyshev"` or :code:`"octile"`, computed
+        from the node coordinates; a :code:`cspath.Landmarks` returned by :code:`cspath.Graph.landmarks`,
+        which needs no coordinates; a callable :code:`heuristic(node, target)` returning a float; or a
+        :code:`numpy.array` holding the estimate for every node. The shortest path is only guaranteed if the
+        estimate never exceeds the real remaining distance.
+
+        coordinates, of shape (number of nodes, 2 or 3), lets the named heuristics work on graphs given by
+        a distance matrix. In coordinate mode the node coordinates are used. If a named heuristic has no
+        coordinates to work with, :code:`cspath.Graph.dijkstra` is used instead.
         
         Returns
         -------
@@ -657,153 +1234,170 @@ class Graph:
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
         """
-        if not self.__coordinateMode:
-            return self.dijkstra()
-        
-
-        ###### The chosen heuristic is the euclidean distance. 
-        ###### This makes a lot of sense since we are dealing
-        ###### with cartesian coordinates.
-        start = time()
-
-        numNodes = len(self.__distMatrix)
+        numNodes = len(self.__storage)
 
         if numNodes == 0:
             return None, None, None
 
-        vis = np.array([], dtype = np.bool)
+        if isinstance(heuristic, str):
+            if coordinates is None and self.__coordinateMode:
+                coordinates = self.__coords.toArray()
+            if coordinates is None:
+                return self.dijkstra(source, target)
 
-        prev = np.array([], dtype = np.int64)
+        start = time()
 
-        heur = np.array([], dtype = np.float64)
+        source, goals, multi = self.__endpoints(source, target, None)
+        target = goals[0]
+        if isinstance(heuristic, Landmarks) and len(heuristic) != numNodes:
+            raise ValueError(f"The landmarks cover {len(heuristic)} nodes and the graph has {numNodes}.")
 
-        shrDist = np.array([], dtype = np.float64)
+        heur = _heuristic(heuristic, coordinates, target)
 
-        for i in np.arange(numNodes):
-            vis = np.append(vis, False)
-            heur = np.append(heur, np.linalg.norm(self.__NodeList[0].get() - self.__NodeList[i].get()))
-            if self.__distMatrix[0][i] >= 0:
-                prev = np.insert(prev, i, 0)
-                shrDist  = np.insert(shrDist, i, self.__distMatrix[0][i])
-            else:
-                prev = np.insert(prev, i,  -1)
-                shrDist  = np.insert(shrDist, i, np.inf)
-        
-        vis[0] = True
-        numVis = 1
+        indptr, indices, weights = self.__storage.toCSR()
 
-        while numVis < len(vis):
+        shrDist, prev = _a_star(indptr, indices, weights, source, target, heur)
 
-            min_idx = 1
+        end = time()
 
-            for i in np.arange(1, numNodes):
+        tour, dist = _result(shrDist, goals, multi, lambda t: _tour(prev, source, t))
 
-                if not vis[i]:
-                    min_idx = i
-                    break
+        return tour, dist, end - start
 
-            for j in np.arange(1, numNodes):
+####### K shortest simple paths (Yen's algorithm).
+    def k_shortest_paths(self, source = 0, target = None):
+        """
+        Finds the shortest simple paths from source to target in increasing order of length, using Yen's
+        algorithm. More information can be found `here`_.
 
-                if heur[j] + shrDist[j] < heur[min_idx] + shrDist[min_idx] and not vis[j]:
-                    min_idx = j
+        Parameters
+        ----------
+            source: int, optional
+            target: int, optional
 
-            for h in np.arange(numNodes):
-                if self.__distMatrix[min_idx][h] > 0 and shrDist[min_idx] + self.__distMatrix[min_idx][h] < shrDist[h]:
-                    shrDist[h] = shrDist[min_idx] + self.__distMatrix[min_idx][h]
-                    prev[h] = min_idx
+        The path is computed from node source (the first node by default) to node target (the last node by default).
 
-            if min_idx == numNodes - 1:
-                break
+        Paths are found lazily: the returned generator only computes the next path when it is asked for,
+        so any number of alternatives can be taken, e.g. with :code:`itertools.islice`. Every path after
+        the first branches off one of the paths found before it at some node, its spur node; the search for
+        the rest of the path from the spur node avoids the nodes before it and the edges taken there by the
+        earlier paths. These searches skip edges and nodes without removing them, so the graph is never
+        changed, and they are guided by the distances to target computed once in the first step, which are
+        exact lower bounds for every search. Changes made to the graph during the iteration are not seen.
+        Edges with negative weight are ignored, as in Dijkstra's algorithm.
 
-            vis[min_idx] = True
-            numVis += 1
+        Returns
+        -------
+            paths: generator of (tour, shrDist), tour a numpy.array and shrDist its length
 
-        end = time()
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if len(self.__storage) == 0:
+            return iter(())
 
-        if shrDist[numNodes - 1] == np.inf:
-            return None, None, end - start
+        source, goals, multi = self.__endpoints(source, target, None)
 
-        tour = np.array([numNodes - 1], dtype = np.uint64)
-        g = prev[numNodes - 1]
+        return _yen(self.__storage.toCSR(), self.__reverseCSR(), source, goals[0])
 
-        while g:
+####### Bellman-Ford Algorithm Implementation.
+    def bellman_ford(self, source = 0, target = None, targets = None):
+        """
+        Standard implementation of Bellman-Ford algorithm. More information can be found `here`_.
+        
+        Returns
+        -------
+            tour: numpy.array containing shortest path
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
 
-            tour = np.append(tour, g)
-            g = prev[g]
+        If a negative cycle is reachable from the start node, tour holds the cycle's nodes 
+        (first node repeated at the end) and shrDist is :code:`"Detected Negative Cycle"`.
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if len(self.__storage) == 0:
+            return None, None, None
 
-        tour = np.append(tour, 0)
-        tour = np.flip(tour)
+        shr, prev, tour, shrDist, duration = self.bellman_ford_all(source, target, targets)
 
-        return tour, shrDist[numNodes - 1], end - start
+        if isinstance(shr, str):
+            return tour, shr, duration
 
-####### Bellman-Ford Algorithm Implementation.
-    def bellman_ford(self):
+        return tour, shrDist, duration
+
+    def bellman_ford_all(self, source = 0, target = None, targets = None):
         """
-        Standard implementation of Bellman-Ford algorithm. More information can be found `here`_.
+        Standard implementation of Bellman-Ford with extra outputs. More information can be found `here`_.
         
         Returns
         -------
+            shr: numpy.array containing shortest distances to all nodes from start node
             tour: numpy.array containing shortest path
+            prev: numpy.array containing previously visited nodes
             shrDist: float or int, length of tour
             duration: float or int, algorithm runtime in seconds
+
+        If a negative cycle is reachable from the start node, shr is :code:`"Detected Negative Cycle"` 
+        and tour holds the cycle's nodes (first node repeated at the end).
+        
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
-        """
-        numNodes = len(self.__distMatrix)
+        """   
+        numNodes = len(self.__storage)
 
         if numNodes == 0:
-            return None, None, None
+            return None, None, None, None, None
 
         start = time()
 
-        shr = np.array([], dtype = np.float64)
+        indptr, indices, weights = self.__storage.toCSR()
 
-        prev = np.array([], dtype = np.int64)
+        source, goals, multi = self.__endpoints(source, target, targets)
 
-        for i in np.arange(numNodes):
-            if self.__distMatrix[0][i] != -np.inf:
-                shr = np.append(shr, self.__distMatrix[0][i])
-                prev = np.append(prev, 0)
-            else:
-                shr = np.append(shr, np.inf)
-                prev = np.append(prev, -1)
+        shr, prev, cycle = _bellman_ford(indptr, indices, weights, source)
 
-        for i in np.arange(1, numNodes):
-            
-            for a in np.arange(numNodes):
-                for b in np.arange(numNodes):
-
-                    if a != b and self.__distMatrix[a][b] != -np.inf:
-                        if self.__distMatrix[a][b] + shr[a] <  shr[b]:
-                            shr[b] = self.__distMatrix[a][b] + shr[a]
-                            prev[b] = a
         end = time()
 
-        for a in np.arange(numNodes):
-            for b in np.arange(numNodes):
+        if cycle is not None:
+            return "Detected Negative Cycle", None, cycle, None,  end - start
 
-                if a != b and self.__distMatrix[a][b] + shr[a] < shr[b] and self.__distMatrix[a][b] != -np.inf:
-                    return None, "Detected Negative Cycle", end - start
+        tour, shrDist = _result(shr, goals, multi, lambda t: _tour(prev, source, t))
 
-        if shr[numNodes - 1] == np.inf:
-            return None, None, end - start
+        if tour is None:
+            return None, None, None, None, end - start
 
-        tour = np.array([numNodes - 1], dtype = np.uint64)
-        g = prev[numNodes - 1]
+        return shr, prev, tour, shrDist, end - start
+
+####### Shortest Path Faster Algorithm (queue-based Bellman-Ford) Implementation.
+    def spfa(self, source = 0, target = None, targets = None):
+        """
+        Queue-based variant of Bellman-Ford, also known as the Shortest Path Faster Algorithm. Only nodes
+        whose distance changed have their edges relaxed again, so on average the work is proportional to
+        the edges actually touched. More information can be found `here`_.
+        
+        Returns
+        -------
+            tour: numpy.array containing shortest path
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
 
-        while g:
+        Negative cycles are reported exactly like :code:`cspath.Graph.bellman_ford`.
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if len(self.__storage) == 0:
+            return None, None, None
 
-            tour = np.append(tour, g)
-            g = prev[g]
+        shr, prev, tour, shrDist, duration = self.spfa_all(source, target, targets)
 
-        tour = np.append(tour, 0)
-        tour = np.flip(tour)
+        if isinstance(shr, str):
+            return tour, shr, duration
 
-        return tour, shr[numNodes - 1], end - start
+        return tour, shrDist, duration
 
-    def bellman_ford_all(self):
+    def spfa_all(self, source = 0, target = None, targets = None):
         """
-        Standard implementation of Bellman-Ford with extra outputs. More information can be found `here`_.
+        Shortest Path Faster Algorithm with extra outputs. More information can be found `here`_.
         
         Returns
         -------
@@ -812,69 +1406,194 @@ class Graph:
             prev: numpy.array containing previously visited nodes
             shrDist: float or int, length of tour
             duration: float or int, algorithm runtime in seconds
+
+        Negative cycles are reported exactly like :code:`cspath.Graph.bellman_ford_all`.
         
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
         """   
-        numNodes = len(self.__distMatrix)
+        numNodes = len(self.__storage)
 
         if numNodes == 0:
-            return None, None, None
+            return None, None, None, None, None
 
         start = time()
 
-        shr = np.array([], dtype = np.float64)
+        indptr, indices, weights = self.__storage.toCSR()
 
-        prev = np.array([], dtype = np.int64)
+        source, goals, multi = self.__endpoints(source, target, targets)
 
-        for i in np.arange(numNodes):
-            if self.__distMatrix[0][i] != -np.inf:
-                shr = np.append(shr, self.__distMatrix[0][i])
-                prev = np.append(prev, 0)
-            else:
-                shr = np.append(shr, np.inf)
-                prev = np.append(prev, -1)
+        shr, prev, cycle = _spfa(indptr, indices, weights, source)
 
-        for i in np.arange(1, numNodes):
-            
-            for a in np.arange(numNodes):
-                for b in np.arange(numNodes):
-
-                    if a != b and self.__distMatrix[a][b] != -np.inf:
-                        if self.__distMatrix[a][b] + shr[a] <  shr[b]:
-                            shr[b] = self.__distMatrix[a][b] + shr[a]
-                            prev[b] = a
         end = time()
 
-        for a in np.arange(numNodes):
-            for b in np.arange(numNodes):
+        if cycle is not None:
+            return "Detected Negative Cycle", None, cycle, None,  end - start
 
-                if a != b and self.__distMatrix[a][b] + shr[a] < shr[b] and self.__distMatrix[a][b] != -np.inf:
-                    return "Detected Negative Cycle", None, None, None,  end - start
+        tour, shrDist = _result(shr, goals, multi, lambda t: _tour(prev, source, t))
 
-        if shr[numNodes - 1] == np.inf:
+        if tour is None:
             return None, None, None, None, end - start
 
-        tour = np.array([numNodes - 1], dtype = np.uint64)
-        g = prev[numNodes - 1]
+        return shr, prev, tour, shrDist, end - start
 
-        while g:
+####### Johnson's Algorithm Implementation.
+    def johnson(self, source = 0, target = None, targets = None, numWorkers = None):
+        """
+        Implementation of Johnson's algorithm. More information can be found `here`_.
 
-            tour = np.append(tour, g)
-            g = prev[g]
+        Parameters
+        ----------
+            source, target, targets: optional, see :code:`cspath.Graph.dijkstra`
+            numWorkers: int, optional, see :code:`cspath.Graph.johnson_all`
+        
+        Returns
+        -------
+            tour: numpy.array containing shortest path
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
+
+        Negative cycles are reported exactly like :code:`cspath.Graph.bellman_ford`.
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """
+        if len(self.__storage) == 0:
+            return None, None, None
+
+        M, prev, tour, shrDist, duration = self.johnson_all(source, target, targets, numWorkers)
 
-        tour = np.append(tour, 0)
-        tour = np.flip(tour)
+        if isinstance(M, str):
+            return tour, M, duration
 
-        return shr, prev, tour, shr[numNodes - 1], end - start
+        return tour, shrDist, duration
+
+    def johnson_all(self, source = 0, target = None, targets = None, numWorkers = None):
+        """
+        Johnson's algorithm for all-pairs shortest paths on sparse graphs, with extra outputs. One Bellman-Ford
+        pass computes node potentials that make every edge weight non-negative, then Dijkstra's algorithm
+        runs from every node, in :math:`O(VE logV)` overall. Negative weights are allowed, as in Bellman-Ford.
+        More information can be found `here`_.
+
+        Parameters
+        ----------
+            source, target, targets: optional, see :code:`cspath.Graph.dijkstra`
+            numWorkers: int, optional
+
+        source, target and targets only select which paths are returned; all pairs are always computed.
+        If numWorkers is greater than 1, the Dijkstra runs are spread over a pool of that many processes.
+        
+        Returns
+        -------
+            M: numpy.array, M[i][j] is the shortest distance from node i to node j
+            prev: numpy.array, prev[i][j] is the node before node j on the shortest path from node i (-1 if there is none)
+            tour: numpy.array containing shortest path
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
+
+        If a negative cycle exists, M is :code:`"Detected Negative Cycle"` and tour holds the cycle's nodes.
+        
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """   
+        numNodes = len(self.__storage)
+
+        if numNodes == 0:
+            return None, None, None, None, None
+
+        start = time()
+
+        source, goals, multi = self.__endpoints(source, target, targets)
+
+        indptr, indices, weights = self.__storage.toCSR()
+
+        h, hPrev, cycle = _bellman_ford(indptr, indices, weights, None)
+
+        if cycle is not None:
+            return "Detected Negative Cycle", None, cycle, None, time() - start
+
+        ##### Reweighted edges are non-negative up to rounding.
+        rows = np.repeat(np.arange(numNodes), np.diff(indptr))
+        reweighted = np.maximum(weights + h[rows] - h[indices], 0)
+
+        sources = np.arange(numNodes)
+
+        if numWorkers is not None and numWorkers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            chunks = np.array_split(sources, min(numNodes, 4 * numWorkers))
+
+            with ProcessPoolExecutor(max_workers = numWorkers) as pool:
+                parts = list(pool.map(_dijkstra_rows, *zip(*[(indptr, indices, reweighted, c) for c in chunks])))
+
+            M = np.concatenate([p[0] for p in parts])
+            prev = np.concatenate([p[1] for p in parts])
+        else:
+            M, prev = _dijkstra_rows(indptr, indices, reweighted, sources)
+
+        ##### Undo the reweighting: d(s, v) = d'(s, v) - h(s) + h(v).
+        M += h[None, :] - h[:, None]
+
+        end = time()
+
+        tour, shrDist = _result(M[source], goals, multi, lambda t: _tour(prev[source], source, t))
+
+        return M, prev, tour, shrDist, end - start
 
 ####### Floyd-Warshall Algorithm Implementation.
-    def floyd_warshall(self):
+    def floyd_warshall(self, source = 0, target = None, targets = None, blockSize = None, numThreads = None):
         """
         Standard implementation of Floyd-Warshall. More information can be found `here`_.
+
+        Parameters
+        ----------
+            source, target, targets: optional, see :code:`cspath.Graph.dijkstra`
+            blockSize: int, optional
+            numThreads: int, optional
+
+        See :code:`cspath.Graph.floyd_warshall_all` for the blocked variant.
+        
+        Returns
+        -------
+            tour: numpy.array containing shortest path
+            shrDist: float or int, length of tour
+            duration: float or int, algorithm runtime in seconds
+        
+        
+        .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
+        """   
+        if len(self.__storage) == 0:
+            return None, None, None, None, None
+
+        M, prev, tour, shrDist, duration = self.floyd_warshall_all(source, target, targets, blockSize, numThreads)
+
+        return tour, shrDist, duration
+
+####### Floyd-Warshall Algorithm Implementation (Returns the full distance and next-node matrices for reuse).
+    def floyd_warshall_all(self, source = 0, target = None, targets = None, blockSize = None, numThreads = None):
+        """
+        Implementation of Floyd-Warshall with extra outputs. Every step is a single vectorized
+        update over the whole matrix. More information can be found `here`_.
+
+        Parameters
+        ----------
+            source, target, targets: optional, see :code:`cspath.Graph.dijkstra`
+            blockSize: int, optional
+            numThreads: int, optional
+
+        source, target and targets only select which paths are returned; all pairs are always computed.
+
+        Graphs with more nodes than blockSize are processed in square tiles of that size so that the
+        working set stays in cache. By default, graphs of 1000 nodes or more use tiles of 256, which is
+        1.1 to 1.7 times faster than one update over the whole matrix on graphs of 1000 to 2000 nodes;
+        smaller matrices fit in cache and are not tiled. Every round updates the diagonal tile
+        first, then the tiles sharing its row or column, then all remaining tiles. With numThreads
+        above 1 (1 by default), the independent tiles of each phase are dispatched to a thread pool;
+        whether that helps depends on the machine, see :code:`benchmarks/floyd_warshall.py`.
         
         Returns
         -------
+            M: numpy.array, M[i][j] is the shortest distance from node i to node j
+            prev: numpy.array, prev[i][j] is the node following node i on the shortest path to node j (-1 if there is none)
             tour: numpy.array containing shortest path
             shrDist: float or int, length of tour
             duration: float or int, algorithm runtime in seconds
@@ -882,54 +1601,54 @@ class Graph:
         
         .. _here: https://cspath.readthedocs.io/en/latest/explanation/index.html
         """   
-        numNodes = len(self.__distMatrix)
+        numNodes = len(self.__storage)
 
         if numNodes == 0:
             return None, None, None, None, None
 
         start = time()
 
-        M = np.array([0], dtype = np.float64)
-        M = np.resize(M, (numNodes, numNodes))
-
-        prev = np.array([0], dtype = np.int64)
-        prev = np.resize(prev, (numNodes, numNodes))
-
-        for i in np.arange(numNodes):
-            for j in np.arange(numNodes):
-                if i == j:
-                    M[i][j] = 0
-                    prev[i][j] = i
-                if self.__distMatrix[i][j] < 0:
-                    M[i][j] = np.inf
-                    prev[i][j] = -1
-                else:
-                    M[i][j] = self.__distMatrix[i][j]
-                    prev[i][j] = j
-
-        for k in np.arange(numNodes):
-            for i in np.arange(numNodes):
-                for j in np.arange(numNodes):
-                    if M[i][j] > M[i][k] + M[k][j]:
-                        M[i][j] = M[i][k] + M[k][j]
-                        prev[i][j] = prev[i][k] 
+        source, goals, multi = self.__endpoints(source, target, targets)
+
+        M, prev = self.__floyd_warshall_init()
+
+        if blockSize is None:
+            blockSize = _FW_BLOCK_SIZE if numNodes >= _FW_BLOCK_MIN_NODES else numNodes
+
+        if blockSize >= numNodes:
+            cand = np.empty_like(M)
+            better = np.empty(M.shape, dtype = np.bool_)
+
+            for k in np.arange(numNodes):
+                _fw_step(M, prev, k, cand, better)
+        else:
+            _blocked_fw(M, prev, int(blockSize), numThreads or 1)
+
         end = time()
 
-        if M[numNodes-1][numNodes-1] == np.inf:
-            return None, None, end-start
-        
-        tour = np.array([], dtype = np.uint64)
+        tour, shrDist = _result(M[source], goals, multi, lambda t: _fw_tour(prev, source, t))
+
+        return M, prev, tour, shrDist, end - start
 
-        u = 0
+####### Build the initial distance and next-node matrices for Floyd-Warshall.
+    def __floyd_warshall_init(self):
+        numNodes = len(self.__storage)
 
-        tour = np.append(tour, u)
+        indptr, indices, weights = self.__storage.toCSR()
+        rows = np.repeat(np.arange(numNodes), np.diff(indptr))
 
-        while u != numNodes - 1:
-            u = prev[u][numNodes - 1]
-            tour = np.append(tour, u)
+        ##### Negative weights are treated as missing edges.
+        keep = weights >= 0
 
+        M = np.full((numNodes, numNodes), np.inf)
+        M[rows[keep], indices[keep]] = weights[keep]
+        np.fill_diagonal(M, 0)
 
-        return tour, M[0][numNodes - 1], end - start
+        prev = np.full((numNodes, numNodes), -1, dtype = np.int64)
+        prev[rows[keep], indices[keep]] = indices[keep]
+        np.fill_diagonal(prev, np.arange(numNodes))
+
+        return M, prev
 
 ######################################
 #  GENERAL GRAPH ANALYSIS UTILITIES  #
@@ -951,14 +1670,7 @@ class Graph:
         -------
             deg: int
         """
-        deg = 0
-        for i in np.arange(len(self.__distMatrix)):
-            if self.__distMatrix[node][i] > 0 and self.__distMatrix[node][i] != np.inf:
-                deg += 1
-            if negIntr:
-                if self.__distMatrix[node][i] < 0 and self.__distMatrix[node][i] != -np.inf:
-                    deg += 1
-        return deg
+        return len(self.get_oneighbors(node, negIntr))
 
 ####### Get In Degree of Node. If negIntr is set to True, we consider
 ####### negative values of the distance matrix as neighbors with negative weight.
@@ -976,14 +1688,7 @@ class Graph:
         -------
             deg: int
         """
-        deg = 0
-        for i in np.arange(len(self.__distMatrix)):
-            if self.__distMatrix[i][node] > 0 and self.__distMatrix[i][node] != np.inf:
-                deg += 1
-            if negIntr:
-                if self.__distMatrix[i][node] < 0 and self.__distMatrix[i][node] != -np.inf:
-                    deg += 1
-        return deg
+        return len(self.get_ineighbors(node, negIntr))
 
 ####### Get In Neighbors of Node. If negIntr is set to True, we consider
 ####### negative values of the distance matrix as neighbors with negative weight.
@@ -999,18 +1704,25 @@ class Graph:
         
         Returns
         -------
-            oneighs: numpy.array of indices of in neighbors
+            ineighs: numpy.array of indices of in neighbors
         
+        With :code:`"dense"` storage this reads one column of the distance matrix, :math:`O(V)`. With
+        :code:`"csr"` storage, which only indexes the out-edges of each node, it scans every edge,
+        :math:`O(E)`; so does :code:`cspath.Graph.changeNode`, which calls it.
         """
-        oneighs = np.array([], dtype = np.uint64)
+        if self.__storageMode == "dense":
+            column = self.__storage.toDense()[:, node]
+            mask = np.isfinite(column) & (column != 0) & (negIntr | (column > 0))
+            mask[node] = False
+
+            return np.flatnonzero(mask).astype(np.uint64)
 
-        for i in np.arange(len(self.__distMatrix)):
-            if self.__distMatrix[node][i] > 0 and self.__distMatrix[node][i] != np.inf:
-                oneighs  = np.append(oneighs, i)
-            if negIntr:
-                if self.__distMatrix[node][i] < 0 and self.__distMatrix[node][i] != -np.inf:
-                    oneighs = np.append(oneighs, i)
-        return oneighs
+        indptr, indices, weights = self.__storage.toCSR()
+
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        mask = (indices == node) & (negIntr | (weights > 0))
+
+        return rows[mask].astype(np.uint64)
 
     
 ####### Get Out Neighbors of Node. If negIntr is set to True, we consider
@@ -1029,13 +1741,760 @@ class Graph:
         -------
             oneighs: numpy.array of indices of out neighbors
         
+        With :code:`"dense"` storage this reads one row of the distance matrix, :math:`O(V)`, rather than
+        the compressed sparse rows, which are rebuilt after every change.
         """
-        oneighs = np.array([], dtype = np.uint64)
+        if self.__storageMode == "dense":
+            row = self.__storage.toDense()[node]
+            mask = np.isfinite(row) & (row != 0) & (negIntr | (row > 0))
+            mask[node] = False
+
+            return np.flatnonzero(mask).astype(np.uint64)
+
+        indptr, indices, weights = self.__storage.toCSR()
+
+        lo, hi = indptr[node], indptr[node + 1]
+        mask = negIntr | (weights[lo:hi] > 0)
+
+        return indices[lo:hi][mask].astype(np.uint64)
+
+################################
+#           HELPERS            #
+################################
+
+##### Share of linked node pairs above which the "auto" engine of Dijkstra's algorithm works on matrix rows.
+_DENSE_DIJKSTRA_DENSITY = 0.25
+
+##### Tile size of the blocked Floyd-Warshall, and the number of nodes from which it is used by default.
+##### On one core, 128 to 512 all beat the unblocked update for 1000 and 2000 nodes, and 256 did best
+##### at 2000; tiles of 64 lose to the Python loop overhead. Below about 900 nodes, tiling is slower.
+_FW_BLOCK_SIZE = 256
+_FW_BLOCK_MIN_NODES = 1000
+
+def _matrixErrors(distanceMatrix, maxCells = 10):
+    """
+    Lists what makes distanceMatrix an invalid distance matrix, one message per kind of problem.
+    Each message shows the first maxCells offending entries and the total count.
+    """
+    if not isinstance(distanceMatrix, np.ndarray) or distanceMatrix.ndim != 2:
+        return [f"Expected a 2-dimensional {np.ndarray} and got {type(distanceMatrix)}."]
+
+    if distanceMatrix.shape[0] != distanceMatrix.shape[1]:
+        return [f"Expected a square matrix and got shape {distanceMatrix.shape}."]
+
+    if distanceMatrix.dtype.kind not in "if":
+        return [f"Expected {np.float64} or {np.int64} for matrix entries and got {distanceMatrix.dtype}."]
+
+    def cells(mask):
+        rows, cols = np.nonzero(mask)
+        shown = ", ".join(f"({i}, {j})" for i, j in zip(rows[:maxCells].tolist(), cols[:maxCells].tolist()))
+        more = f" and {len(rows) - maxCells} more" if len(rows) > maxCells else ""
+        return f"{len(rows)} entries: {shown}{more}."
+
+    errors = []
+    diagonal = np.eye(len(distanceMatrix), dtype = np.bool_)
+
+    nan = np.isnan(distanceMatrix)
+    if nan.any():
+        errors.append(f"NaN entries in {cells(nan)}")
+
+    zero = (distanceMatrix == 0) & ~diagonal
+    if zero.any():
+        errors.append(f"Zero entries not on main diagonal in {cells(zero)}")
+
+    nonZeroDiagonal = (distanceMatrix != 0) & diagonal
+    if nonZeroDiagonal.any():
+        errors.append(f"'Main' diagonal entries not 0 in {cells(nonZeroDiagonal)}")
+
+    return errors
+
+def _heap_dijkstra(indptr, indices, weights, source, targets = None, buffers = None):
+    """
+    Dijkstra's algorithm over compressed sparse rows with a lazy-deletion binary heap.
+    Stops once every node in targets is settled. Edges with negative weight are ignored.
+    buffers is an optional (shr, prev, vis) tuple that is reset and reused instead of allocating new arrays.
+
+    Returns
+    -------
+
+        shr: numpy.array of distances from source
+        prev: numpy.array of predecessors, -1 where unreached and source at source
+    """
+    numNodes = len(indptr) - 1
+
+    shr, prev, vis = _buffers(numNodes, buffers)
+
+    shr[source] = 0
+    prev[source] = source
+    heap = [(0.0, source)]
+    pending = set(targets) if targets is not None else None
+
+    while heap:
+
+        dist, u = heappop(heap)
+
+        ##### Stale entries left behind by later improvements are skipped.
+        if vis[u]:
+            continue
+        vis[u] = True
+
+        if pending is not None:
+            pending.discard(u)
+            if not pending:
+                break
+
+        lo, hi = indptr[u], indptr[u + 1]
+        neighs = indices[lo:hi]
+        cand = dist + weights[lo:hi]
+        better = (weights[lo:hi] >= 0) & (cand < shr[neighs])
+        neighs = neighs[better]
+        cand = cand[better]
+
+        shr[neighs] = cand
+        prev[neighs] = u
+
+        for v, c in zip(neighs.tolist(), cand.tolist()):
+            heappush(heap, (c, v))
+
+    return shr, prev
+
+def _heuristic(heuristic, coordinates, target):
+    """
+    Turns the heuristic argument of :code:`cspath.Graph.a_star` into a numpy.array of estimates or a callable of one node.
+    """
+    if isinstance(heuristic, Landmarks):
+        return heuristic.estimate(target)
+
+    if callable(heuristic):
+        return lambda node: heuristic(node, target)
+
+    if not isinstance(heuristic, str):
+        return np.asarray(heuristic, dtype = np.float64)
+
+    diff = np.abs(np.asarray(coordinates, dtype = np.float64) - np.asarray(coordinates[target], dtype = np.float64))
+
+    if heuristic == "euclidean":
+        return np.sqrt((diff ** 2).sum(axis = 1))
+    if heuristic == "manhattan":
+        return diff.sum(axis = 1)
+    if heuristic == "chebyshev":
+        return diff.max(axis = 1)
+    if heuristic == "octile":
+        ##### Diagonal moves first, then straight ones. In 3D the largest step is along a space diagonal.
+        diff = -np.sort(-diff, axis = 1)
+        steps = np.sqrt(np.arange(1, diff.shape[1] + 1))
+        return diff[:, -1] * steps[-1] + ((diff[:, :-1] - diff[:, 1:]) * steps[:-1]).sum(axis = 1)
+
+    raise ValueError(f"Expected 'euclidean', 'manhattan', 'chebyshev' or 'octile' for heuristic and got {heuristic}.")
+
+def _a_star(indptr, indices, weights, source, target, heur):
+    """
+    A* over compressed sparse rows with a lazy-deletion binary heap. heur is a numpy.array of estimates
+    or a callable of one node. A node is reopened if a shorter path to it turns up after it was expanded,
+    so inconsistent (but admissible) heuristics still give the shortest path. Edges with negative weight are ignored.
+
+    Returns
+    -------
+
+        shr: numpy.array of distances from source (exact for the expanded nodes)
+        prev: numpy.array of predecessors, -1 where unreached and source at source
+    """
+    numNodes = len(indptr) - 1
+
+    if callable(heur):
+        estimate = heur
+    else:
+        estimate = heur.__getitem__
+
+    shr = np.full(numNodes, np.inf)
+    prev = np.full(numNodes, -1, dtype = np.int64)
+
+    shr[source] = 0
+    prev[source] = source
+    heap = [(estimate(source), 0.0, source)]
+
+    while heap:
+
+        f, dist, u = heappop(heap)
+
+        if dist > shr[u]:
+            continue
+
+        if u == target:
+            break
+
+        lo, hi = indptr[u], indptr[u + 1]
+        neighs = indices[lo:hi]
+        cand = dist + weights[lo:hi]
+        better = (weights[lo:hi] >= 0) & (cand < shr[neighs])
+        neighs = neighs[better]
+        cand = cand[better]
+
+        shr[neighs] = cand
+        prev[neighs] = u
+
+        for v, c in zip(neighs.tolist(), cand.tolist()):
+            heappush(heap, (c + estimate(v), c, v))
+
+    return shr, prev
+
+def _bidirectional_dijkstra(forward, backward, source, target):
+    """
+    Bidirectional Dijkstra's algorithm. forward and backward are the (indptr, indices, weights) of the
+    graph and of its reverse. Each step settles the closest node of the direction whose heap has the
+    smaller top; the search stops when the two tops add up to at least the best path found so far.
+    The work arrays are plain lists, since a point-to-point search only touches a few of their entries
+    and scalar access to lists is much cheaper than to numpy arrays. Edges with negative weight are ignored.
+
+    Returns
+    -------
+
+        shrDist: float, length of the shortest path, inf if there is none
+        meet: int, a node on the shortest path, -1 if there is none
+        prev: list of predecessors of the forward search
+        succ: list of successors (towards target) of the backward search
+    """
+    numNodes = len(forward[0]) - 1
+
+    shr = ([np.inf] * numNodes, [np.inf] * numNodes)
+    prev = ([-1] * numNodes, [-1] * numNodes)
+    vis = ([False] * numNodes, [False] * numNodes)
+    heaps = ([(0.0, source)], [(0.0, target)])
+    csr = (forward, backward)
+
+    for side, node in ((0, source), (1, target)):
+        shr[side][node] = 0.0
+        prev[side][node] = node
+
+    best, meet = np.inf, -1
+    if source == target:
+        best, meet = 0.0, source
+
+    while heaps[0] and heaps[1]:
+
+        ##### Any path still to be found is at least as long as the two frontiers together.
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        heap, dists, preds, others = heaps[side], shr[side], prev[side], shr[1 - side]
+        dist, u = heappop(heap)
+
+        if vis[side][u]:
+            continue
+        vis[side][u] = True
+
+        indptr, indices, weights = csr[side]
+        lo, hi = indptr[u], indptr[u + 1]
+
+        for v, w in zip(indices[lo:hi].tolist(), weights[lo:hi].tolist()):
+            cand = dist + w
+            if w < 0 or cand >= dists[v]:
+                continue
+
+            dists[v] = cand
+            preds[v] = u
+            heappush(heap, (cand, v))
+
+            ##### Reaching a node already seen by the other search closes a path. A path through an edge
+            ##### that does not improve its head is never shorter than one found when the head was labelled.
+            if cand + others[v] < best:
+                best, meet = cand + others[v], v
+
+    return best, meet, prev[0], prev[1]
+
+def _transpose_csr(indptr, indices, weights):
+    """
+    Returns the (indptr, indices, weights) of the reversed graph, with the in-edges of every node as its row
+    """
+    numNodes = len(indptr) - 1
+    rows = np.repeat(np.arange(numNodes), np.diff(indptr))
+    order = np.argsort(indices, kind = "stable")
+
+    counts = np.bincount(indices, minlength = numNodes)
+    rIndptr = np.zeros(numNodes + 1, dtype = np.int64)
+    np.cumsum(counts, out = rIndptr[1:])
+
+    return rIndptr, rows[order], weights[order]
+
+def _farthest_landmark(forward, fromLandmarks, toLandmarks, nodes, rng):
+    """
+    Returns the node farthest from the landmarks chosen so far, measured both ways and counting
+    unreachable nodes as farthest. Without landmarks, the farthest node from a random one.
+    """
+    numNodes = len(forward[0]) - 1
+
+    if not nodes:
+        shr = _heap_dijkstra(*forward, int(rng.integers(numNodes)))[0]
+        shr[shr == np.inf] = -1
+        return int(np.argmax(shr))
+
+    spread = (fromLandmarks + toLandmarks).min(axis = 0)
+    spread[nodes] = -1
+
+    return int(np.argmax(spread))
+
+def _avoid_landmark(forward, landmarks, rng):
+    """
+    The avoid strategy of Goldberg and Werneck. A shortest path tree is grown from a random node r and
+    every node gets the weight :math:`d(r, v)` minus the landmark bound of :math:`d(r, v)`, i.e. how poorly
+    the landmarks serve it. Starting at r, the search follows the heaviest subtree without a landmark
+    down to a leaf, which is the new landmark. Returns -1 if every subtree holds a landmark.
+    """
+    numNodes = len(forward[0]) - 1
+    root = int(rng.integers(numNodes))
+
+    shr, prev = _heap_dijkstra(*forward, root)
+    reached = np.flatnonzero(shr != np.inf)
+
+    ##### The lower bounds from r to every node are the bounds from every node to r, read backwards.
+    fromL, toL = landmarks.getDistances()
+    with np.errstate(invalid = "ignore"):
+        bounds = np.maximum(fromL - fromL[:, [root]], toL[:, [root]] - toL)
+    bounds[np.isnan(bounds)] = 0
+
+    size = np.zeros(numNodes)
+    size[reached] = shr[reached] - np.maximum(bounds[:, reached].max(axis = 0, initial = 0), 0)
+    size[landmarks.getNodes()] = -np.inf
+
+    ##### Children are farther from r than their parents, so walking the nodes by decreasing distance
+    ##### sums every subtree before its parent is reached.
+    size, prev = size.tolist(), prev.tolist()
+    best = [-1] * numNodes
+    for v in reached[np.argsort(-shr[reached], kind = "stable")].tolist():
+        if v == root:
+            continue
+
+        p = prev[v]
+        if best[p] == -1 or size[v] > size[best[p]]:
+            best[p] = v
+        size[p] += size[v]
+
+    node = root
+    while best[node] != -1 and size[best[node]] > 0:
+        node = best[node]
+
+    return -1 if node in landmarks.getNodes() else node
+
+def _yen(forward, backward, source, target):
+    """
+    Generator of the simple paths from source to target by increasing length, following Yen. The candidates
+    are kept in a heap, each with its cumulative lengths so that the length of any of its prefixes is known.
+    """
+    heur = _heap_dijkstra(*backward, target)[0].tolist()
+
+    first = _spur_path(forward, source, target, heur, set(), set())
+    if first is None:
+        return
+
+    found = []
+    candidates = [(first[1][-1], first[0], first[1])]
+    seen = {tuple(first[0])}
+
+    while candidates:
+        shrDist, path, dists = heappop(candidates)
+        found.append(path)
+
+        yield np.array(path), shrDist
+
+        for i in range(len(path) - 1):
+            root = path[:i + 1]
+
+            ##### The paths found so far that share the root must not leave the spur node the same way again.
+            blockedEdges = {(p[i], p[i + 1]) for p in found if len(p) > i + 1 and p[:i + 1] == root}
+            spur = _spur_path(forward, path[i], target, heur, set(root[:-1]), blockedEdges)
+
+            if spur is None:
+                continue
+
+            candidate = root[:-1] + spur[0]
+            key = tuple(candidate)
+            if key not in seen:
+                seen.add(key)
+                cumulative = dists[:i] + [dists[i] + d for d in spur[1]]
+                heappush(candidates, (cumulative[-1], candidate, cumulative))
+
+def _spur_path(forward, source, target, heur, blockedNodes, blockedEdges):
+    """
+    A* from source to target over compressed sparse rows without the nodes in blockedNodes and the
+    (u, v) edges in blockedEdges. heur holds the distances to target in the whole graph, which can only
+    grow when nodes and edges are left out, so they are exact lower bounds and nodes never need reopening.
+
+    Returns
+    -------
+
+        (path, dists): lists of the nodes and of their distances from source, None if target cannot be reached
+    """
+    indptr, indices, weights = forward
+
+    if heur[source] == np.inf:
+        return None
+
+    shr = {source: 0.0}
+    prev = {source: source}
+    heap = [(heur[source], 0.0, source)]
+    done = set()
+
+    while heap:
+        f, dist, u = heappop(heap)
+
+        if u in done:
+            continue
+        done.add(u)
+
+        if u == target:
+            path = [u]
+            while u != source:
+                u = prev[u]
+                path.append(u)
+            path.reverse()
+            return path, [shr[v] for v in path]
+
+        lo, hi = indptr[u], indptr[u + 1]
+        for v, w in zip(indices[lo:hi].tolist(), weights[lo:hi].tolist()):
+            cand = dist + w
+            if w < 0 or heur[v] == np.inf or v in blockedNodes or (u, v) in blockedEdges or cand >= shr.get(v, np.inf):
+                continue
+
+            shr[v] = cand
+            prev[v] = u
+            heappush(heap, (cand + heur[v], cand, v))
+
+    return None
+
+def _dijkstra_rows(indptr, indices, weights, sources):
+    """
+    Runs :code:`_heap_dijkstra` from every node in sources and stacks the results into one row per source.
+    Module-level so it can be sent to worker processes.
+    """
+    numNodes = len(indptr) - 1
+
+    M = np.empty((len(sources), numNodes))
+    prev = np.empty((len(sources), numNodes), dtype = np.int64)
+
+    for row, source in enumerate(sources):
+        M[row], prev[row] = _heap_dijkstra(indptr, indices, weights, source)
+
+    return M, prev
+
+def _dense_dijkstra(matrix, source, targets = None, buffers = None):
+    """
+    Dijkstra's algorithm over a distance matrix in :math:`O(V^2)`. Every step is a few whole-row
+    operations: an argmin over the distances of the unvisited nodes and a masked relaxation against
+    the row of the chosen node. Same outputs as :code:`_heap_dijkstra` on the edges of the matrix:
+    negative entries are ignored, and zero and non-finite entries are not edges, as in :code:`denseToCSR`.
+    """
+    numNodes = len(matrix)
+
+    shr, prev, vis = _buffers(numNodes, buffers)
+
+    shr[source] = 0
+    prev[source] = source
+    pending = set(targets) if targets is not None else None
+
+    ##### key is shr with the visited nodes set to inf, so that argmin only sees unvisited ones.
+    key = np.full(numNodes, np.inf)
+    key[source] = 0
+
+    for _ in range(numNodes):
+
+        u = int(np.argmin(key))
+        dist = key[u]
+
+        if dist == np.inf:
+            break
+
+        key[u] = np.inf
+        vis[u] = True
+
+        if pending is not None:
+            pending.discard(u)
+            if not pending:
+                break
+
+        row = matrix[u]
+        cand = dist + row
+        better = (row > 0) & (cand < shr)
+
+        np.copyto(shr, cand, where = better)
+        np.copyto(key, cand, where = better)
+        prev[better] = u
+
+    return shr, prev
+
+def _scan_dijkstra(indptr, indices, weights, source, targets = None, buffers = None):
+    """
+    Dijkstra's algorithm over compressed sparse rows, finding the next node by scanning
+    every unvisited node. Same outputs as :code:`_heap_dijkstra`.
+    """
+    numNodes = len(indptr) - 1
+
+    shr, prev, vis = _buffers(numNodes, buffers)
+
+    shr[source] = 0
+    prev[source] = source
+    pending = set(targets) if targets is not None else None
+
+    for _ in np.arange(numNodes):
+
+        min_idx = np.argmin(np.where(vis, np.inf, shr))
+
+        if vis[min_idx] or shr[min_idx] == np.inf:
+            break
+
+        vis[min_idx] = True
+
+        if pending is not None:
+            pending.discard(min_idx)
+            if not pending:
+                break
+
+        ##### Only the edges leaving min_idx are relaxed.
+        lo, hi = indptr[min_idx], indptr[min_idx + 1]
+        neighs = indices[lo:hi]
+        cand = shr[min_idx] + weights[lo:hi]
+        better = (weights[lo:hi] >= 0) & (cand < shr[neighs])
+
+        shr[neighs[better]] = cand[better]
+        prev[neighs[better]] = min_idx
+
+    return shr, prev
+
+def _buffers(numNodes, buffers):
+    """
+    Returns the shr, prev and vis work arrays of a single-source search, resetting the given ones if any.
+    """
+    if buffers is None:
+        return np.full(numNodes, np.inf), np.full(numNodes, -1, dtype = np.int64), np.zeros(numNodes, dtype = np.bool_)
+
+    shr, prev, vis = buffers
+    shr.fill(np.inf)
+    prev.fill(-1)
+    vis.fill(False)
+
+    return shr, prev, vis
+
+def _result(shr, goals, multi, tourOf):
+    """
+    Builds the tour and shrDist outputs of a solver. For a single end node these are its path and length,
+    or None, None if it cannot be reached. For a list of end nodes, tour is a list of paths (None where
+    unreachable) and shrDist a numpy.array of lengths.
+    """
+    if multi:
+        return [tourOf(t) if shr[t] != np.inf else None for t in goals], shr[goals]
+
+    if shr[goals[0]] == np.inf:
+        return None, None
+
+    return tourOf(goals[0]), shr[goals[0]]
+
+def _tour(prev, source, target):
+    """
+    Walks the predecessor array back from target to source and returns the path as :code:`numpy.array`
+    """
+    return walk(prev, source, target)
+
+def _bellman_ford(indptr, indices, weights, source):
+    """
+    Bellman-Ford over the edge list of the compressed sparse rows. Every round relaxes all edges
+    at once with vectorized operations, and the rounds stop as soon as one makes no improvement.
+    If source is None, every node starts at distance 0, as if a virtual source had a zero-weight
+    edge to every node (the potentials of Johnson's algorithm).
+
+    Returns
+    -------
+
+        shr: numpy.array of distances from source
+        prev: numpy.array of predecessors, -1 where unreached and source at source
+        cycle: numpy.array of the nodes of a negative cycle reachable from source, None if there is none
+    """
+    numNodes = len(indptr) - 1
+
+    ##### Every stored entry is an edge; negative weights included.
+    src = np.repeat(np.arange(numNodes), np.diff(indptr))
+    dst = indices
+
+    shr = np.full(numNodes, np.inf)
+    prev = np.full(numNodes, -1, dtype = np.int64)
+
+    if source is None:
+        shr[:] = 0
+        rounds = numNodes + 1
+    else:
+        shr[source] = 0
+        rounds = numNodes
+
+    for rnd in np.arange(rounds):
+
+        cand = shr[src] + weights
+        better = cand < shr[dst]
+
+        if not better.any():
+            if source is not None:
+                prev[source] = source
+            return shr, prev, None
+
+        new = shr.copy()
+        np.minimum.at(new, dst[better], cand[better])
+
+        hit = better & (cand == new[dst])
+        prev[dst[hit]] = src[hit]
+        shr = new
+
+    ##### Still improving after numNodes - 1 rounds. Walking back from an improved node
+    ##### is guaranteed to end up on the negative cycle.
+    return shr, prev, _prev_cycle(prev, dst[better][0])
+
+def _spfa(indptr, indices, weights, source):
+    """
+    Shortest Path Faster Algorithm over compressed sparse rows. A FIFO queue holds the nodes whose
+    distance changed. Every node counts the edges of its current path, and a count of numNodes
+    means the path repeats a node, i.e. a negative cycle. Same outputs as :code:`_bellman_ford`.
+    """
+    numNodes = len(indptr) - 1
+
+    shr = np.full(numNodes, np.inf)
+    prev = np.full(numNodes, -1, dtype = np.int64)
+    edgeCount = np.zeros(numNodes, dtype = np.int64)
+    inQueue = np.zeros(numNodes, dtype = np.bool_)
+
+    shr[source] = 0
+    queue = deque([source])
+    inQueue[source] = True
+
+    while queue:
+
+        u = queue.popleft()
+        inQueue[u] = False
+
+        lo, hi = indptr[u], indptr[u + 1]
+        neighs = indices[lo:hi]
+        cand = shr[u] + weights[lo:hi]
+        better = cand < shr[neighs]
+        neighs = neighs[better]
+
+        if len(neighs) == 0:
+            continue
+
+        shr[neighs] = cand[better]
+        prev[neighs] = u
+        edgeCount[neighs] = edgeCount[u] + 1
+
+        if edgeCount[u] + 1 >= numNodes:
+            cycle = _prev_cycle(prev, neighs[0])
+
+            ##### Parent pointers may have moved on; Bellman-Ford always recovers the cycle.
+            if cycle is None:
+                cycle = _bellman_ford(indptr, indices, weights, source)[2]
+
+            return shr, prev, cycle
+
+        for v in neighs[~inQueue[neighs]].tolist():
+            queue.append(v)
+        inQueue[neighs] = True
+
+    prev[source] = source
+
+    return shr, prev, None
+
+def _prev_cycle(prev, u):
+    """
+    Follows the predecessors from u. Returns the first cycle met, with its first node repeated at
+    the end, or None if the walk ends at a node without predecessor.
+    """
+    seen = {}
+    path = []
+
+    while u != -1 and u not in seen:
+        seen[u] = len(path)
+        path.append(u)
+        u = prev[u]
+
+    if u == -1:
+        return None
+
+    cycle = path[seen[u]:] + [u]
+
+    return np.array(cycle[::-1], dtype = np.uint64)
+
+def _fw_step(M, prev, k, cand, better):
+    """
+    Performs step k of Floyd-Warshall in place as one vectorized update. cand and better are
+    work buffers shaped like M. Rows that cannot reach node k are skipped when they are the majority.
+    Row and column k do not change during step k, so updating in place is safe.
+    """
+    rows = np.flatnonzero(M[:, k] != np.inf)
+
+    if len(rows) <= 1:
+        return
+
+    if 2 * len(rows) < len(M):
+        sub = M[rows]
+        subCand = sub[:, k, None] + M[None, k, :]
+        subBetter = subCand < sub
+
+        if subBetter.any():
+            subPrev = prev[rows]
+            np.copyto(subPrev, subPrev[:, k, None], where = subBetter)
+            prev[rows] = subPrev
+            M[rows] = np.minimum(sub, subCand)
+    else:
+        np.add(M[:, k, None], M[None, k, :], out = cand)
+        np.less(cand, M, out = better)
+
+        np.copyto(prev, prev[:, k, None], where = better)
+        np.minimum(M, cand, out = M)
+
+def _fw_tile(M, prev, I, J, K):
+    """
+    Relaxes tile M[I, J] through the nodes of K one at a time, in order. The tile is small enough
+    to stay in cache across the whole loop.
+    """
+    C = M[I, J]
+    P = prev[I, J]
+
+    for k in range(K.start, K.stop):
+        cand = M[I, k, None] + M[None, k, J]
+        better = cand < C
+
+        np.copyto(P, prev[I, k, None], where = better)
+        np.minimum(C, cand, out = C)
+
+def _blocked_fw(M, prev, blockSize, numThreads):
+    """
+    Tiled Floyd-Warshall on M and prev in place. Each round handles one diagonal tile in three phases;
+    the tiles within phases two and three are independent and run on a thread pool, as NumPy releases the GIL.
+    """
+    numNodes = len(M)
+    tiles = [slice(s, min(s + blockSize, numNodes)) for s in range(0, numNodes, blockSize)]
+
+    def run(jobs):
+        if numThreads > 1 and len(jobs) > 1:
+            list(pool.map(lambda job: job[0](M, prev, *job[1:]), jobs))
+        else:
+            for job in jobs:
+                job[0](M, prev, *job[1:])
+
+    with ThreadPoolExecutor(max_workers = numThreads) as pool:
+        for K in tiles:
+            ##### Phase 1: the diagonal tile.
+            _fw_tile(M, prev, K, K, K)
+
+            ##### Phase 2: the tiles in the same row or column as the diagonal tile.
+            run([(_fw_tile, K, J, K) for J in tiles if J != K] + [(_fw_tile, I, K, K) for I in tiles if I != K])
+
+            ##### Phase 3: all remaining tiles.
+            run([(_fw_tile, I, J, K) for I in tiles if I != K for J in tiles if J != K])
+
+def _fw_tour(prev, source, target):
+    """
+    Follows the next-node matrix of Floyd-Warshall from source to target and returns the path as :code:`numpy.array`
+    """
+    tour = [source]
+    u = source
+
+    while u != target:
+        u = prev[u][target]
+        tour.append(u)
 
-        for i in np.arange(len(self.__distMatrix)):
-            if self.__distMatrix[i][node] > 0 and self.__distMatrix[i][node] != np.inf:
-                oneighs  = np.append(oneighs, i)
-            if negIntr:
-                if self.__distMatrix[i][node] < 0 and self.__distMatrix[i][node] != -np.inf:
-                    oneighs = np.append(oneighs, i)
-        return oneighs
+    return np.array(tour, dtype = np.uint64)
@@ -0,0 +1,116 @@
+"""An indexed priority queue used by the shortest-path algorithms. Not to be used by the user."""
+###############################
+#     INDEXED HEAP CLASS      #
+###############################
+
+class IndexedHeap:
+    """
+    Array-backed indexed d-ary min-heap over the keys 0, 1, ..., size - 1.
+    Each key is present at most once, so lowering its priority is an in-place decrease-key
+    instead of a second entry.
+
+    Parameters
+    ----------
+
+        size: int, number of keys
+        d: int, optional, number of children per heap entry
+    """
+    def __init__(self, size, d = 4):
+        self.__d = d
+        self.__keys = [0] * size
+        self.__prio = [0.0] * size
+        self.__pos = [-1] * size
+        self.__len = 0
+
+    def __len__(self):
+        return self.__len
+
+    def __contains__(self, key):
+        return self.__pos[key] != -1
+
+    def push(self, key, priority):
+        """
+        Inserts key with the given priority. If key is already queued, its priority is
+        lowered to the given one (higher priorities are ignored).
+
+        Parameters
+        ----------
+
+            key: int
+            priority: float or int
+        """
+        p = self.__pos[key]
+
+        if p == -1:
+            p = self.__len
+            self.__len += 1
+            self.__keys[p] = key
+            self.__pos[key] = p
+        elif priority >= self.__prio[p]:
+            return
+
+        self.__prio[p] = priority
+        self.__siftUp(p)
+
+    def pop(self):
+        """
+        Removes the key with the smallest priority
+
+        Returns
+        -------
+
+            key: int
+            priority: float or int
+        """
+        keys, prio, pos = self.__keys, self.__prio, self.__pos
+
+        key, priority = keys[0], prio[0]
+        pos[key] = -1
+
+        self.__len -= 1
+        if self.__len:
+            last = self.__len
+            keys[0], prio[0] = keys[last], prio[last]
+            pos[keys[0]] = 0
+            self.__siftDown(0)
+
+        return key, priority
+
+    def __siftUp(self, p):
+        d, keys, prio, pos = self.__d, self.__keys, self.__prio, self.__pos
+        key, priority = keys[p], prio[p]
+
+        while p:
+            parent = (p - 1) // d
+            if prio[parent] <= priority:
+                break
+            keys[p], prio[p] = keys[parent], prio[parent]
+            pos[keys[p]] = p
+            p = parent
+
+        keys[p], prio[p] = key, priority
+        pos[key] = p
+
+    def __siftDown(self, p):
+        d, keys, prio, pos, size = self.__d, self.__keys, self.__prio, self.__pos, self.__len
+        key, priority = keys[p], prio[p]
+
+        while True:
+            first = d * p + 1
+            if first >= size:
+                break
+
+            best = first
+            for c in range(first + 1, min(first + d, size)):
+                if prio[c] < prio[best]:
+                    best = c
+
+            if prio[best] >= priority:
+                break
+
+            keys[p], prio[p] = keys[best], prio[best]
+            pos[keys[p]] = p
+            p = best
+
+        keys[p], prio[p] = key, priority
+        pos[key] = p
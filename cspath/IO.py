@@ -0,0 +1,249 @@
+"""Reading and writing graphs on disk. Not to be used by the user."""
+import json
+import os
+import tempfile
+import numpy as np
+from itertools import islice
+###############################
+#        BINARY FORMAT        #
+###############################
+
+MAGIC = b"CSPATH\x00\x00"
+VERSION = 1
+ALIGN = 64
+
+##### A graph file is laid out as:
+#####
+#####     magic         8 bytes, MAGIC
+#####     version       uint32, little endian
+#####     headerLength  uint32, little endian
+#####     header        headerLength bytes of UTF-8 JSON
+#####     data          raw C-ordered arrays, each starting at a multiple of ALIGN bytes
+#####
+##### The header holds the graph metadata under "meta" and, under "arrays", the name, dtype, shape
+##### and offset (from the start of the data section) of every array.
+
+def writeGraph(path, meta, arrays):
+    """
+    Writes a graph file
+
+    Parameters
+    ----------
+
+        path: str or path-like
+        meta: dict, JSON-serializable metadata
+        arrays: dict of numpy.array
+    """
+    entries = []
+    offset = 0
+
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        entries.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({"meta": meta, "arrays": entries}).encode("utf-8")
+    start = _align(16 + len(header))
+
+    ##### The file is written next to path and then renamed onto it. Truncating path in place would pull the
+    ##### pages from under every memory map of it, including those of the arrays being saved.
+    fd, temp = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(path)), prefix = ".", suffix = ".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.array([VERSION, len(header)], dtype = "<u4").tobytes())
+            f.write(header)
+
+            for entry, array in zip(entries, arrays.values()):
+                f.seek(start + entry["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+
+            ##### Pads the file to the end of the last array, in case it is empty.
+            f.truncate(start + offset)
+
+        os.chmod(temp, _mode(path))
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+def readGraph(path, mmap = True):
+    """
+    Reads a graph file written by :code:`writeGraph`
+
+    Parameters
+    ----------
+
+        path: str or path-like
+        mmap: boolean, optional
+
+    If mmap is True, the arrays are copy-on-write memory maps of the file: nothing is read until it is
+    used, processes opening the same file share its pages, and changes are never written back.
+    Otherwise the arrays are read into memory.
+
+    Returns
+    -------
+
+        meta: dict
+        arrays: dict of numpy.array
+    """
+    with open(path, "rb") as f:
+        if f.read(8) != MAGIC:
+            raise ValueError(f"{path} is not a CSPath graph file.")
+
+        version, length = np.frombuffer(f.read(8), dtype = "<u4").tolist()
+        if version > VERSION:
+            raise ValueError(f"{path} uses graph file version {version}, newer than the supported version {VERSION}.")
+
+        header = json.loads(f.read(length).decode("utf-8"))
+
+    start = _align(16 + length)
+    arrays = {}
+
+    for entry in header["arrays"]:
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        offset = start + entry["offset"]
+
+        if int(np.prod(shape)) == 0:
+            arrays[entry["name"]] = np.zeros(shape, dtype = dtype)
+        elif mmap:
+            arrays[entry["name"]] = np.memmap(path, dtype = dtype, mode = "c", offset = offset, shape = shape)
+        else:
+            arrays[entry["name"]] = np.fromfile(path, dtype = dtype, count = int(np.prod(shape)), offset = offset).reshape(shape)
+
+    return header["meta"], arrays
+
+###############################
+#         EDGE LISTS          #
+###############################
+
+def readEdgeList(path, fileFormat = None, delimiter = None, chunkSize = 1000000, header = False):
+    """
+    Reads a text file with one edge per line, chunkSize lines at a time, so that only one chunk of
+    text is held in memory besides the edge arrays themselves
+
+    Parameters
+    ----------
+
+        path: str or path-like
+        fileFormat: str, optional, :code:`"csv"`, :code:`"tsv"`, :code:`"dimacs"` or :code:`"text"`
+        delimiter: str, optional
+        chunkSize: int, optional
+        header: boolean, optional, skip the first line
+
+    With the default fileFormat, it is guessed from the extension of path (.csv, .tsv and .gr for DIMACS),
+    falling back to :code:`"text"`. CSV, TSV and text lines hold the source node, the target node and,
+    optionally, a weight (1 if missing), separated by delimiter (whitespace for text); lines starting
+    with # are skipped. Their node IDs can be any strings and are numbered in order of appearance.
+    DIMACS files have :code:`a u v w` arc lines over the nodes 1, ..., n declared in :code:`p sp n m`.
+    A weight of 0 or a non-finite weight raises a ValueError naming its line, since a distance matrix
+    cannot hold such an edge.
+
+    Returns
+    -------
+
+        src: numpy.array of source node indices
+        dst: numpy.array of target node indices
+        weights: numpy.array
+        ids: numpy.array, external ID of every node index
+    """
+    if fileFormat is None:
+        fileFormat = {".csv": "csv", ".tsv": "tsv", ".gr": "dimacs"}.get(os.path.splitext(str(path))[1].lower(), "text")
+
+    if fileFormat not in ("csv", "tsv", "dimacs", "text"):
+        raise ValueError(f"Expected 'csv', 'tsv', 'dimacs' or 'text' for fileFormat and got {fileFormat}.")
+
+    if delimiter is None:
+        delimiter = {"csv": ",", "tsv": "\t"}.get(fileFormat)
+
+    chunks = []
+    index = {}
+    numNodes = None
+    lineNo = 1
+
+    with open(path, "r") as f:
+        if header:
+            f.readline()
+            lineNo += 1
+
+        while True:
+            lines = list(islice(f, chunkSize))
+            if not lines:
+                break
+
+            chunkStart = lineNo
+            lineNo += len(lines)
+
+            ##### Only the data lines are parsed, so that comment and blank lines neither warn nor shift line numbers.
+            if fileFormat == "dimacs":
+                for line in lines:
+                    if line.startswith("p"):
+                        numNodes = int(line.split()[2])
+
+                rows = [n for n, line in enumerate(lines) if line.startswith("a")]
+            else:
+                rows = [n for n, line in enumerate(lines) if line.split("#", 1)[0].strip() != ""]
+
+            if not rows:
+                continue
+
+            data = [lines[n] for n in rows]
+
+            if fileFormat == "dimacs":
+                table = np.loadtxt(data, usecols = (1, 2, 3), ndmin = 2)
+                src = table[:, 0].astype(np.int64) - 1
+                dst = table[:, 1].astype(np.int64) - 1
+                weights = table[:, 2]
+            else:
+                table = np.loadtxt(data, dtype = str, delimiter = delimiter, comments = "#", ndmin = 2)
+
+                ##### Each distinct ID of the chunk is looked up once, in order of appearance; new ones get the next free index.
+                unique, first, inverse = np.unique(table[:, :2], return_index = True, return_inverse = True)
+                order = np.argsort(first)
+                mapped = np.empty(len(unique), dtype = np.int64)
+                mapped[order] = [index.setdefault(key, len(index)) for key in unique[order].tolist()]
+                nodes = mapped[inverse.reshape(-1, 2)]
+
+                src = nodes[:, 0]
+                dst = nodes[:, 1]
+                weights = table[:, 2].astype(np.float64) if table.shape[1] > 2 else np.ones(len(table))
+
+            bad = np.flatnonzero((weights == 0) | ~np.isfinite(weights))
+            if len(bad):
+                raise ValueError(f"Line {chunkStart + rows[bad[0]]} of {path} has weight {weights[bad[0]]}; edge weights must be finite and non-zero.")
+
+            chunks.append((src, dst, weights))
+
+    src = np.concatenate([c[0] for c in chunks]) if chunks else np.zeros(0, dtype = np.int64)
+    dst = np.concatenate([c[1] for c in chunks]) if chunks else np.zeros(0, dtype = np.int64)
+    weights = np.concatenate([c[2] for c in chunks]) if chunks else np.zeros(0)
+
+    if fileFormat == "dimacs":
+        if numNodes is None:
+            numNodes = int(max(src.max(initial = -1), dst.max(initial = -1))) + 1
+        ids = np.arange(1, numNodes + 1)
+
+        if len(src) and (min(src.min(), dst.min()) < 0 or max(src.max(), dst.max()) >= numNodes):
+            raise ValueError(f"Arcs of {path} use nodes outside 1, ..., {numNodes}.")
+    else:
+        ids = np.array(list(index), dtype = str)
+
+    return src, dst, weights, ids
+
+################################
+#           HELPERS            #
+################################
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+def _mode(path):
+    ##### The permissions of the file being replaced, or those open() would give a new file.
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
@@ -0,0 +1,84 @@
+"""Landmark distances for the ALT lower bounds of :code:`cspath.Graph.a_star`."""
+import numpy as np
+from .IO import writeGraph, readGraph
+###############################
+#          LANDMARKS          #
+###############################
+
+KIND = "landmarks"
+
+class Landmarks:
+    """
+    The distances from and to a few landmark nodes of a graph, as returned by :code:`cspath.Graph.landmarks`.
+
+    By the triangle inequality, the distance from a node v to a target t is at least
+    :math:`d(L, t) - d(L, v)` and at least :math:`d(v, L) - d(t, L)` for every landmark L. The largest of
+    these bounds never overestimates, so it can be passed as the heuristic of :code:`cspath.Graph.a_star`
+    on graphs without coordinates (A*, Landmarks and the Triangle inequality, or ALT). The landmarks are
+    a snapshot: after edges get shorter the bounds may be too large, and the landmarks should be computed again.
+
+    Parameters
+    ----------
+
+        nodes: numpy.array of the landmark nodes
+        fromLandmarks: numpy.array of shape (landmarks, nodes), distances from every landmark, inf where unreachable
+        toLandmarks: numpy.array of shape (landmarks, nodes), distances to every landmark, inf where unreachable
+    """
+    def __init__(self, nodes, fromLandmarks, toLandmarks):
+        self.__nodes = nodes
+        self.__from = fromLandmarks
+        self.__to = toLandmarks
+
+    def __len__(self):
+        return self.__from.shape[1]
+
+    def getNodes(self):
+        """
+        Returns the landmark nodes as :code:`numpy.array`
+        """
+        return self.__nodes
+
+    def getDistances(self):
+        """
+        Returns the distances from and to every landmark as two :code:`numpy.array` of shape (landmarks, nodes)
+        """
+        return self.__from, self.__to
+
+    def estimate(self, target):
+        """
+        Returns the lower bound of the distance from every node to target as :code:`numpy.array`.
+        It is inf for nodes that provably cannot reach target.
+        """
+        with np.errstate(invalid = "ignore"):
+            bounds = np.maximum(self.__from[:, [target]] - self.__from, self.__to - self.__to[:, [target]])
+
+        ##### inf - inf leaves nan where a landmark reaches (or is reached by) neither node, which bounds nothing.
+        bounds[np.isnan(bounds)] = 0
+
+        return np.maximum(bounds.max(axis = 0, initial = 0), 0)
+
+    def save(self, path):
+        """
+        Saves the landmarks to a file in CSPath's binary format, see :code:`cspath.Graph.save`
+        """
+        writeGraph(path, {"kind": KIND}, {"nodes": self.__nodes, "from": self.__from, "to": self.__to})
+
+    @classmethod
+    def load(cls, path, mmap = True):
+        """
+        Loads landmarks saved with :code:`save`. With mmap, the arrays are memory-mapped, see :code:`cspath.Graph.load`
+
+        Returns
+        -------
+
+            landmarks: cspath.Landmarks.Landmarks
+        """
+        meta, arrays = readGraph(path, mmap)
+
+        if meta.get("kind") != KIND:
+            raise ValueError(f"{path} does not hold landmarks.")
+
+        return cls(arrays["nodes"], arrays["from"], arrays["to"])
+
+    def __repr__(self):
+        return f"Landmarks {self.__nodes.tolist()} over {len(self)} nodes"
@@ -1,5 +1,6 @@
 """A class for handling Nodes described by 3D Cartesian Coordinates. Not to be used by the user."""
 import numpy as np
+from .Storage import CoordinateStore
 ###############################
 #           NODE CLASS        #
 ###############################
@@ -8,6 +9,11 @@ class Node:
     """
     A class for handling Nodes described by 3D Cartesian Coordinates
     Initializes instance of :code:`cspath.Node` with coordinates x, y, z
+
+    A Node does not keep its own coordinates. It is a handle to one row of a :code:`CoordinateStore`,
+    the one holding the coordinates of every node of a :code:`cspath.Graph`, or a store of its own
+    when created directly. Two handles to the same row are equal. The setters of a handle to a node
+    of a graph go through :code:`cspath.Graph.changeNode`, so the graph stays consistent.
         
     Parameters
     ----------
@@ -16,19 +22,49 @@ class Node:
         y: float or int
         z: float or int
     """
+    __slots__ = ("__store", "__index", "__graph")
+
     def __init__(self, x, y, z):
-        self.__vec = np.array([np.float64(x), np.float64(y), np.float64(z)])
+        self.__store = CoordinateStore(np.array([np.float64(x), np.float64(y), np.float64(z)]))
+        self.__index = 0
+        self.__graph = None
+
+    @classmethod
+    def fromStore(cls, store, index, graph = None):
+        """
+        Returns a handle to row index of store, without copying the coordinates
+        
+        Parameters
+        ----------
+        
+            store: cspath.Storage.CoordinateStore
+            index: int
+            graph: cspath.Graph, optional, the graph owning store
+        """
+        node = cls.__new__(cls)
+        node.__store = store
+        node.__index = index
+        node.__graph = graph
+        return node
 
     def get(self):
         """
-        Get coordinates of Node as :code:`numpy.array`
+        Get coordinates of Node as :code:`numpy.array`, a view of its row in the store
         
         Returns
         -------
         
-            cspath.Node.__vec: numpy.array
+            vec: numpy.array
         """
-        return self.__vec
+        return self.__store.toArray()[self.__index]
+
+    def __eq__(self, other):
+        if not isinstance(other, Node):
+            return NotImplemented
+        return self.__store is other.__store and self.__index == other.__index
+
+    def __hash__(self):
+        return hash((id(self.__store), self.__index))
     
     def setX(self, x):
         """
@@ -39,8 +75,8 @@ class Node:
         
             x: float or int
         """
-        nx = np.float64(x)
-        self.__vec[0] = nx
+        vec = self.get()
+        self.setNode(x, vec[1], vec[2])
 
     def setY(self, y):
         """
@@ -51,8 +87,8 @@ class Node:
         
             y: float or int
         """
-        ny = np.float64(y)
-        self.__vec[1] = ny
+        vec = self.get()
+        self.setNode(vec[0], y, vec[2])
     
     def setZ(self, z):
         """
@@ -63,8 +99,8 @@ class Node:
         
             z: float or int
         """
-        nz = np.float64(z)
-        self.__vec[2] = nz
+        vec = self.get()
+        self.setNode(vec[0], vec[1], z)
 
     def setNode(self, x, y, z):
         """
@@ -76,13 +112,23 @@ class Node:
             x: float or int
             y: float or int
             z: float or int
+
+        For a node of a graph, the node index, the weights of its edges and the shortest paths kept by
+        the graph are updated too. Raises ValueError if another node of the graph is already at x, y, z.
         """
-        self.setX(x)
-        self.setY(y)
-        self.setZ(z)
+        if self.__graph is None:
+            self.get()[:] = (np.float64(x), np.float64(y), np.float64(z))
+            return
+
+        other = self.__graph.findNode(x, y, z)
+        if other is not None and other != self.__index:
+            raise ValueError(f"Node {other} of the graph is already at ({x}, {y}, {z}).")
+
+        self.__graph.changeNode(self.__index, x, y, z)
 
     def __repr__(self):
-        return f"Node @ ({self.__vec[0]}, {self.__vec[1]}, {self.__vec[2]})"
+        vec = self.get()
+        return f"Node @ ({vec[0]}, {vec[1]}, {vec[2]})"
 
 ################################
 #           HELPERS            #
@@ -0,0 +1,404 @@
+"""Adjacency storage backends for :code:`cspath.Graph`. Not to be used by the user."""
+import numpy as np
+###############################
+#       DENSE STORAGE         #
+###############################
+
+class DenseStorage:
+    """
+    Stores the graph as a square distance matrix of type :code:`numpy.array`.
+    Missing edges are marked with :code:`fill`.
+
+    The matrix is the top-left corner of a larger buffer whose size doubles whenever it
+    runs out of room, so adding nodes one by one copies the matrix only :math:`O(log n)` times.
+
+    Parameters
+    ----------
+
+        matrix: numpy.array
+        fill: float, value marking a missing edge
+    """
+    def __init__(self, matrix, fill = np.inf):
+        self.__buffer = matrix
+        self.__matrix = matrix
+        self.__csr = None
+        self.__numEdges = None
+        self.fill = fill
+
+    def __len__(self):
+        return len(self.__matrix)
+
+    def get(self, i, j):
+        """
+        Returns the weight of the edge from node i to node j
+        """
+        return self.__matrix[i][j]
+
+    def set(self, i, j, w):
+        """
+        Sets the weight of the edge from node i to node j
+        """
+        self.__matrix[i][j] = w
+        self.__csr = None
+        self.__numEdges = None
+
+    def setMany(self, rows, cols, weights):
+        """
+        Sets the weights of the edges from rows[k] to cols[k] in one vectorized assignment
+        """
+        self.__matrix[rows, cols] = weights
+        self.__csr = None
+        self.__numEdges = None
+
+    def remove(self, i, j):
+        """
+        Removes the edge from node i to node j
+        """
+        self.set(i, j, self.fill)
+
+    def addNode(self):
+        """
+        Appends an unlinked node to the storage
+        """
+        self.addNodes(1)
+
+    def addNodes(self, count):
+        """
+        Appends count unlinked nodes to the storage
+        """
+        numNodes = len(self.__matrix)
+        size = numNodes + count
+
+        ##### Cells outside the matrix always hold fill, so only the new diagonal entries need writing.
+        if size > len(self.__buffer):
+            self.__buffer = grow(self.__matrix, size, self.fill, np.float64)
+
+        new = np.arange(numNodes, size)
+        self.__buffer[new, new] = 0
+
+        self.__matrix = self.__buffer[:size, :size]
+        self.__csr = None
+
+    def numEdges(self):
+        """
+        Returns the number of edges. The count is cached until the storage is modified.
+        """
+        if self.__csr is not None:
+            return len(self.__csr[1])
+
+        if self.__numEdges is None:
+            M = self.__matrix
+            self.__numEdges = int(np.count_nonzero(np.isfinite(M) & (M != 0)) - np.count_nonzero(np.isfinite(np.diagonal(M)) & (np.diagonal(M) != 0)))
+
+        return self.__numEdges
+
+    def toDense(self):
+        """
+        Returns the distance matrix, a view into the storage buffer
+        """
+        return self.__matrix
+
+    def toCSR(self):
+        """
+        Returns the edges as compressed sparse rows. The result is cached until the storage is modified.
+
+        Returns
+        -------
+
+            indptr: numpy.array, row i spans indices[indptr[i]:indptr[i + 1]]
+            indices: numpy.array of edge heads
+            weights: numpy.array of edge weights
+        """
+        if self.__csr is None:
+            self.__csr = denseToCSR(self.__matrix)
+        return self.__csr
+
+###############################
+#        CSR STORAGE          #
+###############################
+
+class CSRStorage:
+    """
+    Stores the graph in compressed sparse row format, keeping only actual edges.
+    Column indices are kept sorted within every row. Like the matrix of :code:`DenseStorage`,
+    indptr is a view into a buffer that doubles in size when nodes are added.
+
+    Inserting into the middle of the arrays costs :math:`O(E)`, so edges set one at a time are kept
+    in a dict and merged in a single pass, through :code:`setMany`, the next time the arrays are read.
+    The arrays returned by :code:`toCSR` are never written to afterwards: a merge builds new arrays,
+    and the weights are copied before the first in-place update after they were handed out.
+
+    Parameters
+    ----------
+
+        indptr: numpy.array, optional
+        indices: numpy.array, optional
+        weights: numpy.array, optional
+        fill: float, value reported for a missing edge
+    """
+    def __init__(self, indptr = None, indices = None, weights = None, fill = np.inf):
+        if indptr is None:
+            indptr = np.zeros(1, dtype = np.int64)
+            indices = np.array([], dtype = np.int64)
+            weights = np.array([], dtype = np.float64)
+
+        self.__indptr = np.asarray(indptr, dtype = np.int64)
+        self.__indptrBuffer = self.__indptr
+        self.__indices = np.asarray(indices, dtype = np.int64)
+        self.__weights = np.asarray(weights, dtype = np.float64)
+        self.__pending = {}
+        self.__shared = False
+        self.fill = fill
+
+    @classmethod
+    def fromDense(cls, matrix, fill = np.inf):
+        """
+        Builds CSR storage from a distance matrix
+        """
+        indptr, indices, weights = denseToCSR(matrix)
+        return cls(indptr, indices, weights, fill)
+
+    def __len__(self):
+        return len(self.__indptr) - 1
+
+    def __find(self, i, j):
+        lo = self.__indptr[i]
+        hi = self.__indptr[i + 1]
+        pos = lo + np.searchsorted(self.__indices[lo:hi], j)
+        return pos, pos < hi and self.__indices[pos] == j
+
+    def get(self, i, j):
+        """
+        Returns the weight of the edge from node i to node j
+        """
+        if i == j:
+            return 0
+
+        w = self.__pending.get((i, j))
+        if w is not None:
+            return w if np.isfinite(w) and w != 0 else self.fill
+
+        pos, found = self.__find(i, j)
+        if found:
+            return self.__weights[pos]
+        return self.fill
+
+    def set(self, i, j, w):
+        """
+        Sets the weight of the edge from node i to node j. As in a distance matrix, 0 and non-finite weights are no edge.
+        """
+        pos, found = self.__find(i, j)
+
+        ##### Existing edges are updated in place; anything else waits for the next merge.
+        if found and (i, j) not in self.__pending and np.isfinite(w) and w != 0:
+            if self.__shared:
+                self.__weights = self.__weights.copy()
+                self.__shared = False
+            self.__weights[pos] = w
+        else:
+            self.__pending[(i, j)] = float(w)
+
+    def setMany(self, rows, cols, weights):
+        """
+        Sets the weights of the edges from rows[k] to cols[k], rebuilding the arrays once.
+        Later entries win over earlier ones and over existing edges; 0 and non-finite weights remove the edge.
+        """
+        self.__flush()
+        self.__merge(rows, cols, weights)
+
+    def __flush(self):
+        if self.__pending:
+            (rows, cols), weights = zip(*self.__pending.keys()), list(self.__pending.values())
+            self.__pending = {}
+            self.__merge(rows, cols, weights)
+
+    def __merge(self, rows, cols, weights):
+        numNodes = len(self)
+
+        oldRows = np.repeat(np.arange(numNodes), np.diff(self.__indptr))
+        r = np.concatenate((oldRows, np.asarray(rows, dtype = np.int64)))
+        c = np.concatenate((self.__indices, np.asarray(cols, dtype = np.int64)))
+        w = np.concatenate((self.__weights, np.asarray(weights, dtype = np.float64)))
+
+        ##### A stable sort keeps the entries of each (row, column) pair in order, so the last one is kept.
+        key = r * numNodes + c
+        order = np.argsort(key, kind = "stable")
+        last = np.ones(len(key), dtype = np.bool_)
+        last[:-1] = key[order][1:] != key[order][:-1]
+        keep = order[last]
+        keep = keep[np.isfinite(w[keep]) & (w[keep] != 0)]
+
+        ##### indptr gets a new buffer of the same capacity, as the old one may have been handed out.
+        self.__indptrBuffer = np.zeros(len(self.__indptrBuffer), dtype = np.int64)
+        self.__indptr = self.__indptrBuffer[:numNodes + 1]
+        np.cumsum(np.bincount(r[keep], minlength = numNodes), out = self.__indptr[1:])
+
+        self.__indices = c[keep]
+        self.__weights = w[keep]
+        self.__shared = False
+
+    def remove(self, i, j):
+        """
+        Removes the edge from node i to node j
+        """
+        self.set(i, j, np.inf)
+
+    def addNode(self):
+        """
+        Appends an unlinked node to the storage
+        """
+        self.addNodes(1)
+
+    def addNodes(self, count):
+        """
+        Appends count unlinked nodes to the storage
+        """
+        size = len(self.__indptr)
+
+        if size + count > len(self.__indptrBuffer):
+            self.__indptrBuffer = grow(self.__indptr, size + count, 0, np.int64)
+
+        self.__indptrBuffer[size:size + count] = self.__indptr[-1]
+        self.__indptr = self.__indptrBuffer[:size + count]
+
+    def numEdges(self):
+        """
+        Returns the number of edges
+        """
+        self.__flush()
+        return len(self.__indices)
+
+    def toDense(self):
+        """
+        Returns the equivalent distance matrix. Missing edges are marked with :code:`fill`.
+        """
+        self.__flush()
+        numNodes = len(self)
+
+        matrix = np.full((numNodes, numNodes), self.fill, dtype = np.float64)
+        np.fill_diagonal(matrix, 0)
+        rows = np.repeat(np.arange(numNodes), np.diff(self.__indptr))
+        matrix[rows, self.__indices] = self.__weights
+
+        return matrix
+
+    def toCSR(self):
+        """
+        Returns the edges as compressed sparse rows. Later changes to the storage do not alter the returned arrays.
+
+        Returns
+        -------
+
+            indptr: numpy.array, row i spans indices[indptr[i]:indptr[i + 1]]
+            indices: numpy.array of edge heads
+            weights: numpy.array of edge weights
+        """
+        self.__flush()
+        self.__shared = True
+        return self.__indptr, self.__indices, self.__weights
+
+###############################
+#     COORDINATE STORAGE      #
+###############################
+
+class CoordinateStore:
+    """
+    Stores the coordinates of all nodes as the rows of one contiguous (n, 3) :code:`numpy.array`.
+    Like the matrix of :code:`DenseStorage`, it is a view into a buffer that doubles when full.
+
+    Parameters
+    ----------
+
+        coords: numpy.array of shape (n, 3), optional
+    """
+    __slots__ = ("__buffer", "__size")
+
+    def __init__(self, coords = None):
+        if coords is None:
+            coords = np.zeros((0, 3))
+
+        self.__buffer = np.asarray(coords, dtype = np.float64).reshape(-1, 3)
+        self.__size = len(self.__buffer)
+
+    def __len__(self):
+        return self.__size
+
+    def append(self, coords):
+        """
+        Appends the rows of coords and returns the index of the first one
+        """
+        coords = np.asarray(coords, dtype = np.float64).reshape(-1, 3)
+        first = self.__size
+        size = first + len(coords)
+
+        if size > len(self.__buffer):
+            buffer = np.zeros((max(size, 2 * len(self.__buffer)), 3))
+            buffer[:first] = self.toArray()
+            self.__buffer = buffer
+
+        self.__buffer[first:size] = coords
+        self.__size = size
+
+        return first
+
+    def toArray(self):
+        """
+        Returns the coordinates as an (n, 3) view into the buffer
+        """
+        return self.__buffer[:self.__size]
+
+################################
+#           HELPERS            #
+################################
+
+def grow(array, size, fill, dtype):
+    """
+    Copies array into a larger buffer of the given dtype whose dimensions are all at least size
+    and at least double the current ones. The remaining entries are set to fill.
+
+    Parameters
+    ----------
+
+        array: numpy.array
+        size: int, minimum new length of every dimension
+        fill: value of the new entries
+        dtype: numpy dtype of the buffer
+
+    Returns
+    -------
+
+        buffer: numpy.array
+    """
+    buffer = np.full(tuple(max(size, 2 * d) for d in array.shape), fill, dtype = dtype)
+    buffer[tuple(slice(0, d) for d in array.shape)] = array
+
+    return buffer
+
+def denseToCSR(matrix):
+    """
+    Extracts the edges of a distance matrix in compressed sparse row format. An entry
+    is an edge if it is off the main diagonal, finite and non-zero.
+
+    Parameters
+    ----------
+
+        matrix: numpy.array
+
+    Returns
+    -------
+
+        indptr: numpy.array
+        indices: numpy.array
+        weights: numpy.array
+    """
+    M = np.asarray(matrix, dtype = np.float64)
+    numNodes = len(M)
+
+    mask = np.isfinite(M) & (M != 0)
+    np.fill_diagonal(mask, False)
+    rows, cols = np.nonzero(mask)
+
+    indptr = np.zeros(numNodes + 1, dtype = np.int64)
+    np.cumsum(np.bincount(rows, minlength = numNodes), out = indptr[1:])
+
+    return indptr, cols.astype(np.int64), M[rows, cols]
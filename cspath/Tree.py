@@ -0,0 +1,292 @@
+"""Result object of the single-source shortest path algorithms of :code:`cspath.Graph`."""
+import numpy as np
+from heapq import heapify, heappush, heappop
+from .Storage import grow
+###############################
+#     SHORTEST PATH TREE      #
+###############################
+
+class ShortestPathTree:
+    """
+    The shortest paths from one source node to every node of a graph, as returned by
+    :code:`cspath.Graph.shortest_path_tree`. Only the distances and predecessors are kept;
+    the path to a node is rebuilt when it is asked for, in a buffer allocated once.
+
+    Parameters
+    ----------
+
+        source: int
+        shr: numpy.array of distances from source, inf where unreachable
+        prev: numpy.array of predecessors, -1 where unreachable and source at source
+        buffer: numpy.array, optional, at least as long as prev, to rebuild the paths in
+    """
+    def __init__(self, source, shr, prev, buffer = None):
+        self.__source = int(source)
+        self.__shr = shr
+        self.__prev = prev
+        self.__buffer = np.empty(len(prev), dtype = np.uint64) if buffer is None else buffer
+
+    def __len__(self):
+        return len(self.__shr)
+
+    def getSource(self):
+        """
+        Returns the source node
+        """
+        return self.__source
+
+    def getDistances(self):
+        """
+        Returns the distances from the source to every node as :code:`numpy.array`, inf where unreachable
+        """
+        return self.__shr
+
+    def getPredecessors(self):
+        """
+        Returns the node before every node on its shortest path as :code:`numpy.array`, -1 where unreachable
+        """
+        return self.__prev
+
+    def getSize(self):
+        """
+        Returns the memory taken by the tree in bytes
+        """
+        return self.__shr.nbytes + self.__prev.nbytes + self.__buffer.nbytes
+
+    def distance(self, target):
+        """
+        Returns the length of the shortest path from the source to target, inf if there is none
+        """
+        return self.__shr[target]
+
+    def reachable(self, target):
+        """
+        Returns True if there is a path from the source to target
+        """
+        return bool(self.__shr[target] != np.inf)
+
+    def path(self, target):
+        """
+        Returns the shortest path from the source to target
+
+        Parameters
+        ----------
+
+            target: int
+
+        Returns
+        -------
+
+            tour: numpy.array containing the shortest path, None if target cannot be reached
+        """
+        if self.__shr[target] == np.inf:
+            return None
+
+        return walk(self.__prev, self.__source, target, self.__buffer)
+
+    def paths(self, targets):
+        """
+        Returns the list of shortest paths from the source to every node of targets, see :code:`path`
+        """
+        return [self.path(target) for target in targets]
+
+    def __repr__(self):
+        return f"ShortestPathTree from {self.__source} over {len(self)} nodes"
+
+###############################
+#  DYNAMIC SHORTEST PATH TREE #
+###############################
+
+class DynamicShortestPathTree(ShortestPathTree):
+    """
+    A :code:`ShortestPathTree` that stays correct while the edges of its graph change, as returned by
+    :code:`cspath.Graph.dynamic_tree`. After each change only the part of the tree that the change affects
+    is searched again, in the manner of Ramalingam and Reps:
+
+    - if an edge gets shorter or is added, a Dijkstra search starts from its head and only continues
+      through nodes whose distance improves;
+    - if an edge on the tree gets longer or is removed, the nodes below it are detached and reattached
+      through their best edge from the rest of the tree. Changes to edges off the tree cost nothing.
+
+    The tree keeps its own copy of the edges as dicts, so each change costs time proportional to the
+    nodes and edges around it rather than to the graph. As in Dijkstra's algorithm, edges with negative
+    weight are ignored.
+
+    Parameters
+    ----------
+
+        source: int
+        indptr, indices, weights: numpy.array, edges of the graph in compressed sparse rows
+    """
+    def __init__(self, source, indptr, indices, weights):
+        self.__source = int(source)
+        self.rebuild(indptr, indices, weights)
+
+    def rebuild(self, indptr, indices, weights):
+        """
+        Replaces all edges and recomputes the tree from scratch
+        """
+        numNodes = len(indptr) - 1
+        self.__out = [{} for _ in range(numNodes)]
+        self.__in = [{} for _ in range(numNodes)]
+
+        rows = np.repeat(np.arange(numNodes), np.diff(indptr))
+        for u, v, w in zip(rows.tolist(), indices.tolist(), weights.tolist()):
+            if w >= 0:
+                self.__out[u][v] = w
+                self.__in[v][u] = w
+
+        ##### The arrays are views of buffers that addNodes grows by doubling, like the storages of cspath.Graph.
+        self.__shrBuffer = np.full(numNodes, np.inf)
+        self.__prevBuffer = np.full(numNodes, -1, dtype = np.int64)
+        self.__walkBuffer = np.empty(numNodes, dtype = np.uint64)
+
+        self.__shr = self.__shrBuffer[:numNodes]
+        self.__prev = self.__prevBuffer[:numNodes]
+        self.__shr[self.__source] = 0
+        self.__prev[self.__source] = self.__source
+
+        self.__search([(0.0, self.__source)])
+        ShortestPathTree.__init__(self, self.__source, self.__shr, self.__prev, self.__walkBuffer)
+
+    def addNodes(self, count):
+        """
+        Appends count unlinked, hence unreachable, nodes
+        """
+        self.__out.extend({} for _ in range(count))
+        self.__in.extend({} for _ in range(count))
+
+        numNodes = len(self.__shr) + count
+        if numNodes > len(self.__shrBuffer):
+            self.__shrBuffer = grow(self.__shrBuffer, numNodes, np.inf, np.float64)
+            self.__prevBuffer = grow(self.__prevBuffer, numNodes, -1, np.int64)
+            self.__walkBuffer = np.empty(len(self.__shrBuffer), dtype = np.uint64)
+
+        self.__shr = self.__shrBuffer[:numNodes]
+        self.__prev = self.__prevBuffer[:numNodes]
+        ShortestPathTree.__init__(self, self.__source, self.__shr, self.__prev, self.__walkBuffer)
+
+    def setEdge(self, u, v, w):
+        """
+        Sets the weight of the edge from node u to node v and repairs the tree. A weight of None, a
+        non-finite or a negative weight removes the edge.
+        """
+        if u == v:
+            return
+
+        old = self.__out[u].get(v)
+
+        if w is None or not np.isfinite(w) or w < 0:
+            w = None
+            self.__out[u].pop(v, None)
+            self.__in[v].pop(u, None)
+        else:
+            w = float(w)
+            self.__out[u][v] = w
+            self.__in[v][u] = w
+
+        if w == old:
+            return
+
+        if w is not None and (old is None or w < old):
+            self.__decrease(u, v, w)
+        else:
+            self.__increase(u, v)
+
+    def __decrease(self, u, v, w):
+        shr, prev = self.__shr, self.__prev
+
+        if shr[u] + w < shr[v]:
+            shr[v] = shr[u] + w
+            prev[v] = u
+            self.__search([(shr[v], v)])
+
+    def __increase(self, u, v):
+        shr, prev, out, inn = self.__shr, self.__prev, self.__out, self.__in
+
+        ##### Only the subtree hanging from the edge depends on it.
+        if prev[v] != u or v == self.__source:
+            return
+
+        affected = [v]
+        detached = {v}
+        for x in affected:
+            for y in out[x]:
+                if prev[y] == x and y not in detached:
+                    detached.add(y)
+                    affected.append(y)
+
+        shr[affected] = np.inf
+        prev[affected] = -1
+
+        ##### Every detached node is first reattached through its best edge from the rest of the tree.
+        heap = []
+        for x in affected:
+            best, parent = np.inf, -1
+            for y, w in inn[x].items():
+                if y not in detached and shr[y] + w < best:
+                    best, parent = shr[y] + w, y
+
+            if parent != -1:
+                shr[x] = best
+                prev[x] = parent
+                heap.append((best, x))
+
+        heapify(heap)
+        self.__search(heap)
+
+    def __search(self, heap):
+        shr, prev, out = self.__shr, self.__prev, self.__out
+
+        while heap:
+            dist, x = heappop(heap)
+
+            if dist > shr[x]:
+                continue
+
+            for y, w in out[x].items():
+                cand = dist + w
+                if cand < shr[y]:
+                    shr[y] = cand
+                    prev[y] = x
+                    heappush(heap, (cand, y))
+
+################################
+#           HELPERS            #
+################################
+
+def walk(prev, source, target, buffer = None):
+    """
+    Walks the predecessor array back from target to source, filling buffer from its end,
+    and returns the path as :code:`numpy.array`
+
+    Parameters
+    ----------
+
+        prev: numpy.array of predecessors
+        source: int
+        target: int
+        buffer: numpy.array, optional, at least as long as prev
+
+    Returns
+    -------
+
+        tour: numpy.array
+    """
+    if buffer is None:
+        buffer = np.empty(len(prev), dtype = np.uint64)
+
+    i = len(buffer) - 1
+    buffer[i] = target
+    u = int(target)
+
+    while u != source:
+        ##### A path longer than the number of nodes can only come from a cycle in prev.
+        if i == 0:
+            raise ValueError(f"The predecessors of {target} do not lead back to {source}.")
+
+        u = int(prev[u])
+        i -= 1
+        buffer[i] = u
+
+    return buffer[i:].copy()
@@ -1,2 +1,5 @@
 from .Graph import Graph
 from .Node import Node, nodeEq, nodeInList
+from .Tree import ShortestPathTree
+from .CH import ContractionHierarchy
+from .Landmarks import Landmarks
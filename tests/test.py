@@ -1,5 +1,12 @@
+import itertools
+import os
+import tempfile
+import time
+import warnings
 import numpy as np
 import cspath as csp
+from cspath.Storage import CSRStorage
+from cspath.Graph import _FW_BLOCK_MIN_NODES
 
 
 """
@@ -72,6 +79,50 @@ def test_IsValidDistanceMatrix():
       assert not g.IsValidDistanceMatrix(dm4)
       assert not g.IsValidDistanceMatrix(dm5)
 
+      #Invalid distance matrix: not square, NaN entry
+      assert not g.IsValidDistanceMatrix(np.zeros((2, 3)))
+      assert not g.IsValidDistanceMatrix(np.array([[0, np.nan], [1, 0]]))
+
+      #Every invalid entry is reported
+      dm6 = np.array([
+            [1, 0, 2],
+            [0, 0, 3],
+            [2, 0, 1]
+      ])
+
+      try:
+            g.checkDistanceMatrix(dm6)
+            assert False
+      except ValueError as error:
+            assert "3 entries: (0, 1), (1, 0), (2, 1)." in str(error)
+            assert "2 entries: (0, 0), (2, 2)." in str(error)
+
+      assert g.setDistanceMatrix(dm6, validate = False)
+      assert csp.Graph(dm6, validate = False).getDistanceMatrix() is dm6
+
+def test_IndexedHeap():
+
+      """
+      This code tests class cspath.Heap.IndexedHeap
+      """
+
+      from cspath.Heap import IndexedHeap
+
+      ipq = IndexedHeap(5, d = 2)
+
+      ipq.push(3, 7)
+      ipq.push(1, 4)
+      ipq.push(4, 9)
+      ipq.push(4, 2)
+      ipq.push(1, 8)
+
+      assert len(ipq) == 3
+      assert 4 in ipq and 0 not in ipq
+      assert ipq.pop() == (4, 2)
+      assert ipq.pop() == (1, 4)
+      assert ipq.pop() == (3, 7)
+      assert len(ipq) == 0
+
 def test_a_star():
 
       """
@@ -85,6 +136,89 @@ def test_a_star():
       assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
       assert result[1] == 8
 
+      """
+      Node coordinates on a line make the euclidean distance to node 6 an admissible estimate
+      """
+
+      coordinates = np.array([[0, 0], [1, 0], [1, 0], [2, 0], [4, 0], [3, 0], [8, 0]])
+
+      for heuristic in ("euclidean", "manhattan", "chebyshev", "octile"):
+            result = g.a_star(heuristic = heuristic, coordinates = coordinates)
+            assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+            assert result[1] == 8
+
+      result = g.a_star(heuristic = lambda node, target: 0)
+
+      assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+
+      result = g.a_star(heuristic = np.array([8, 3, 7, 5, 4, 5, 0]))
+
+      assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+      assert result[1] == 8
+
+def test_landmarks():
+
+      """
+      This code tests function cspath.Graph.Graph.landmarks
+      """
+
+      g = csp.Graph(tMatrix)
+      path = os.path.join(tempfile.mkdtemp(), "graph.alt")
+
+      for strategy in ("farthest", "avoid"):
+            landmarks = g.landmarks(3, strategy)
+
+            assert len(set(landmarks.getNodes().tolist())) == 3
+
+            result = g.a_star(heuristic = landmarks)
+
+            assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+            assert result[1] == 8
+
+            """
+            The estimate never exceeds the real distance, here to node 6
+            """
+
+            assert np.all(landmarks.estimate(6) <= np.array([8, 11, 7, 9, 4, 5, 0]))
+
+            landmarks.save(path)
+            loaded = csp.Landmarks.load(path)
+
+            assert np.array_equal(loaded.getNodes(), landmarks.getNodes())
+            assert np.array_equal(g.a_star(source = 1, target = 6, heuristic = loaded)[0], np.array([1, 5, 6]))
+
+      mtrx = np.array([
+            [     0,      2],
+            [np.inf,      0]
+      ])
+
+      landmarks = csp.Graph(mtrx).landmarks(2)
+
+      assert landmarks.estimate(0)[1] == np.inf
+      assert csp.Graph(mtrx).a_star(source = 1, target = 0, heuristic = landmarks)[0] is None
+
+      try:
+            csp.Graph(mtrx).a_star(heuristic = g.landmarks(2))
+            assert False
+      except ValueError:
+            pass
+
+      g.save(path)
+
+      try:
+            csp.Landmarks.load(path)
+            assert False
+      except ValueError:
+            pass
+
+      landmarks.save(path)
+
+      try:
+            csp.Graph.load(path)
+            assert False
+      except ValueError:
+            pass
+
 def test_addNode():
       
       
@@ -100,6 +234,28 @@ def test_addNode():
 
       assert np.array_equal(g.getNodeList(), np.array([n1, n2]))
 
+      """
+      Adding many nodes grows the storage buffers several times
+      """
+
+      g1 = csp.Graph()
+      g2 = csp.Graph(storage = "csr")
+
+      for g in (g1, g2):
+            for i in range(20):
+                  g.addNode(i, 0, 0)
+            for i in range(19):
+                  g.linkNodes(i, i + 1, False)
+
+      expected = np.full((20, 20), -np.inf)
+      np.fill_diagonal(expected, 0)
+      expected[np.arange(19), np.arange(1, 20)] = 1
+
+      assert np.array_equal(g1.getDistanceMatrix(), expected)
+      assert np.array_equal(g2.getDistanceMatrix(), expected)
+      assert len(g1.getNodeList()) == 20
+      assert g1.dijkstra()[1] == 19
+
 def test_bellman_ford():
 
       """
@@ -129,6 +285,144 @@ def test_bellman_ford_all():
       assert np.array_equal(result[2], np.array([0, 2, 4, 6]))
       assert result[3] == 8
 
+def test_bellman_ford_negative_cycle():
+
+      """
+      This code tests the negative cycle detection of cspath.Graph.Graph.bellman_ford
+      """
+
+      mtrx = np.array([
+            [     0,      1, np.inf, np.inf],
+            [np.inf,      0,      2, np.inf],
+            [np.inf,     -4,      0,      1],
+            [np.inf, np.inf, np.inf,      0]
+      ])
+
+      g = csp.Graph(mtrx)
+
+      result = g.bellman_ford()
+
+      assert result[1] == "Detected Negative Cycle"
+      assert np.array_equal(result[0], np.array([2, 1, 2])) or np.array_equal(result[0], np.array([1, 2, 1]))
+
+      result = g.bellman_ford_all()
+
+      assert result[0] == "Detected Negative Cycle"
+      assert len(result[2]) == 3
+
+def test_shortest_path_tree():
+
+      """
+      This code tests function cspath.Graph.Graph.shortest_path_tree
+      """
+
+      g = csp.Graph(tMatrix)
+
+      for algorithm in ("dijkstra", "bellman_ford", "spfa"):
+            tree = g.shortest_path_tree(algorithm = algorithm)
+
+            assert isinstance(tree, csp.ShortestPathTree)
+            assert np.array_equal(tree.getDistances(), np.array([0, 5, 1, 3, 4, 11, 8]))
+            assert np.array_equal(tree.path(6), np.array([0, 2, 4, 6]))
+            assert np.array_equal(tree.path(0), np.array([0]))
+            assert np.array_equal(tree.path(5), np.array([0, 1, 5]))
+            assert tree.distance(5) == 11
+
+      tree = g.shortest_path_tree(6)
+
+      assert [len(tour) for tour in tree.paths(range(7))] == [4, 3, 3, 4, 2, 2, 1]
+
+      mtrx = np.array([
+            [     0,      2, np.inf],
+            [np.inf,      0, np.inf],
+            [     4, np.inf,      0]
+      ])
+
+      tree = csp.Graph(mtrx).shortest_path_tree()
+
+      assert not tree.reachable(2)
+      assert tree.path(2) is None
+
+def test_spfa():
+
+      """
+      This code tests functions cspath.Graph.Graph.spfa and cspath.Graph.Graph.spfa_all
+      """
+
+      g = csp.Graph(tMatrix)
+
+      result = g.spfa()
+
+      assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+      assert result[1] == 8
+
+      result = g.spfa_all()
+
+      assert np.array_equal(result[0], np.array([0, 5, 1, 3, 4, 11, 8]))
+      assert np.array_equal(result[1], np.array([0, 0, 0, 0, 2, 1, 4]))
+      assert np.array_equal(result[2], np.array([0, 2, 4, 6]))
+      assert result[3] == 8
+
+      mtrx = np.array([
+            [     0,      1, np.inf, np.inf],
+            [np.inf,      0,      2, np.inf],
+            [np.inf,     -4,      0,      1],
+            [np.inf, np.inf, np.inf,      0]
+      ])
+
+      result = csp.Graph(mtrx).spfa()
+
+      assert result[1] == "Detected Negative Cycle"
+      assert result[0][0] == result[0][-1]
+
+def test_cache():
+
+      """
+      This code tests functions cspath.Graph.Graph.enableCache and cspath.Graph.Graph.getCacheStats
+      """
+
+      g = csp.Graph()
+
+      for x in range(4):
+            g.addNode(x, 0, 0)
+      for i in range(3):
+            g.linkNodes(i, i + 1, True)
+
+      assert g.getCacheStats() is None
+
+      g.enableCache()
+
+      tree = g.shortest_path_tree(0)
+
+      assert g.shortest_path_tree(0) is tree
+      assert g.shortest_path_tree(0, "spfa") is not tree
+      assert g.getCacheStats()["hits"] == 1
+      assert g.getCacheStats()["misses"] == 2
+      assert g.getCacheStats()["entries"] == 2
+
+      version = g.getVersion()
+      g.delLink(1, 2, True)
+
+      assert g.getVersion() == version + 1
+      assert not g.shortest_path_tree(0).reachable(3)
+      assert g.getCacheStats()["invalidations"] == 1
+      assert g.getCacheStats()["entries"] == 1
+
+      """
+      A budget for two trees keeps the two most recently used ones
+      """
+
+      g.enableCache(2 * tree.getSize())
+
+      t0 = g.shortest_path_tree(0)
+      t1 = g.shortest_path_tree(1)
+      g.shortest_path_tree(0)
+      g.shortest_path_tree(2)
+
+      assert g.shortest_path_tree(0) is t0
+      assert g.shortest_path_tree(1) is not t1
+      assert g.getCacheStats()["evictions"] == 2
+
 def test_changeNode():
       
       """
@@ -145,6 +439,116 @@ def test_changeNode():
 
       assert np.array_equal(g.getNodeList()[1].get(), np.array([45, 55, 65]))
 
+      """
+      Moving a node through its handle updates the node index and the edge weights
+      """
+
+      g = csp.Graph()
+      g.addNode(0, 0, 0)
+      node = g.addNode(3, 4, 0)
+      g.linkNodes(0, 1, True)
+      g.enableCache()
+      g.shortest_path_tree(0)
+
+      node.setX(6)
+
+      assert g.findNode(6, 4, 0) == 1
+      assert g.findNode(3, 4, 0) is None
+      assert g.getDistanceMatrix()[0][1] == np.sqrt(52)
+      assert g.getDistanceMatrix()[1][0] == np.sqrt(52)
+      assert g.shortest_path_tree(0).distance(1) == np.sqrt(52)
+      assert g.addNode(3, 4, 0) is not None
+
+      g.getNodeList()[2].setNode(1, 1, 1)
+
+      assert g.findNode(1, 1, 1) == 2
+
+      try:
+            node.setNode(1, 1, 1)
+            assert False
+      except ValueError:
+            pass
+
+def test_csrStorage():
+
+      """
+      This code tests cspath.Graph.Graph with storage = "csr"
+      """
+
+      g = csp.Graph(tMatrix, storage = "csr")
+
+      assert g.getStorageMode() == "csr"
+      assert np.array_equal(g.getDistanceMatrix(), tMatrix)
+
+      for solver in (g.dijkstra, g.ipq_dijkstra, g.a_star, g.bellman_ford, g.floyd_warshall):
+            result = solver()
+            assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+            assert result[1] == 8
+
+      assert np.array_equal(g.get_oneighbors(1), np.array([0, 3, 5]))
+      assert np.array_equal(g.get_ineighbors(4), np.array([2, 3, 6]))
+
+      g1 = csp.Graph()
+      g2 = csp.Graph(storage = "csr")
+
+      for g in (g1, g2):
+            g.addNode(100, 100, 100)
+            g.addNode(200, 200, 200)
+            g.addNode(200, 300, 300)
+            g.linkNodes(0, 1, True)
+            g.linkNodes(1, 2, False)
+            g.delLink(0, 1, False)
+
+      assert np.array_equal(g1.getDistanceMatrix(), g2.getDistanceMatrix())
+
+      """
+      As in a distance matrix, a weight of 0 is no edge
+      """
+
+      storage = CSRStorage.fromDense(tMatrix)
+      storage.set(0, 1, 0)
+      storage.setMany(np.array([0, 2]), np.array([2, 4]), np.array([0, 5]))
+
+      assert storage.get(0, 1) == np.inf
+      assert storage.get(0, 2) == np.inf
+      assert storage.get(2, 4) == 5
+      assert storage.numEdges() == np.count_nonzero(np.isfinite(tMatrix)) - 7 - 2
+
+      """
+      Edges set one at a time are merged when the arrays are read
+      """
+
+      storage = CSRStorage.fromDense(tMatrix)
+      storage.set(6, 0, 2)
+      storage.set(0, 1, 7)
+      storage.set(6, 0, 3)
+      storage.remove(0, 3)
+
+      assert storage.get(6, 0) == 3
+      assert storage.get(0, 3) == np.inf
+
+      mtrx = tMatrix.copy()
+      mtrx[6, 0], mtrx[0, 1], mtrx[0, 3] = 3, 7, np.inf
+
+      assert np.array_equal(storage.toDense(), mtrx)
+      assert storage.numEdges() == np.count_nonzero(np.isfinite(mtrx)) - 7
+
+      """
+      Arrays returned by toCSR are not changed by later edits
+      """
+
+      held = storage.toCSR()
+      copies = [array.copy() for array in held]
+
+      storage.set(6, 0, 4)
+      storage.set(1, 0, 9)
+      storage.remove(0, 1)
+      storage.addNodes(2)
+      storage.toCSR()
+
+      assert all(np.array_equal(array, copy) for array, copy in zip(held, copies))
+      assert storage.get(6, 0) == 4 and storage.get(1, 0) == 9 and storage.get(0, 1) == np.inf
+
 def test_delLink():
       
       """
@@ -191,6 +595,53 @@ def test_delLink():
 
 
 
+def test_dynamic_tree():
+
+      """
+      This code tests function cspath.Graph.Graph.dynamic_tree
+      """
+
+      g = csp.Graph()
+
+      for x in range(5):
+            g.addNode(x, x % 2, 0)
+      for i in range(4):
+            g.linkNodes(i, i + 1, False)
+
+      tree = g.dynamic_tree(0)
+
+      assert np.allclose(tree.getDistances(), np.sqrt(2) * np.arange(5))
+
+      g.linkNodes(0, 4, False)
+
+      assert tree.distance(4) == 4
+      assert np.array_equal(tree.path(4), np.array([0, 4]))
+
+      g.delLink(0, 4, True)
+
+      assert np.array_equal(tree.path(4), np.array([0, 1, 2, 3, 4]))
+
+      g.delLink(1, 2, True)
+
+      assert np.array_equal(np.isinf(tree.getDistances()), np.array([False, False, True, True, True]))
+      assert tree.path(3) is None
+
+      g.changeNode(4, 1, 0, 0)
+      g.linkNodes(1, 4, False)
+      g.addNode(9, 9, 9)
+
+      assert np.array_equal(tree.path(4), np.array([0, 1, 4]))
+      assert np.array_equal(tree.getDistances(), g.shortest_path_tree(0).getDistances())
+
+      for x in range(10, 30):
+            g.addNode(x, 0, 0)
+            g.linkNodes(x - 5, x - 4, False)
+
+      assert len(tree) == len(g.getCoordinates()) == 26
+      assert np.array_equal(tree.getDistances(), g.shortest_path_tree(0).getDistances())
+      assert np.array_equal(tree.getPredecessors(), g.shortest_path_tree(0).getPredecessors())
+      assert tree.path(25) is None
+
 def test_dijkstra():
 
       """
@@ -204,6 +655,182 @@ def test_dijkstra():
       assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
       assert result[1] == 8
 
+      for engine in ("heap", "scan", "dense"):
+            result = g.dijkstra(engine = engine)
+
+            assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+            assert result[1] == 8
+
+      rng = np.random.default_rng(0)
+      mtrx = rng.uniform(1, 10, (60, 60))
+      mtrx[rng.random((60, 60)) < 0.5] = np.inf
+      np.fill_diagonal(mtrx, 0)
+
+      dense = csp.Graph(mtrx).dijkstra_all(source = 3, engine = "dense")
+      sparse = csp.Graph(mtrx, storage = "csr").dijkstra_all(source = 3)
+
+      assert np.array_equal(dense[0], sparse[0])
+      assert np.array_equal(dense[1], sparse[1])
+
+      """
+      A 0 off the diagonal is no edge for every engine
+      """
+
+      mtrx = np.array([
+            [     0,      0,      5],
+            [np.inf,      0,      1],
+            [np.inf, np.inf,      0]
+      ])
+      g0 = csp.Graph(mtrx, validate = False)
+
+      for engine in ("heap", "scan", "dense"):
+            result = g0.dijkstra(0, 2, engine = engine)
+
+            assert np.array_equal(result[0], np.array([0, 2]))
+            assert result[1] == 5
+
+      mtrx = rng.uniform(1, 10, (60, 60))
+      mtrx[rng.random((60, 60)) < 0.4] = np.inf
+      mtrx[rng.random((60, 60)) < 0.2] = 0
+      np.fill_diagonal(mtrx, 0)
+      g0 = csp.Graph(mtrx, validate = False)
+
+      dense = g0.dijkstra_all(source = 3, engine = "dense")
+      heap = g0.dijkstra_all(source = 3, engine = "heap")
+
+      assert np.array_equal(dense[0], heap[0])
+      assert np.array_equal(dense[1], heap[1])
+
+      try:
+            g.dijkstra(engine = "fast")
+            assert False
+      except ValueError:
+            pass
+
+def test_bidirectional_dijkstra():
+
+      """
+      This code tests function cspath.Graph.Graph.bidirectional_dijkstra
+      """
+
+      g = csp.Graph(tMatrix)
+
+      result = g.bidirectional_dijkstra()
+
+      assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+      assert result[1] == 8
+
+      result = g.bidirectional_dijkstra(source = 1, target = 4)
+
+      assert result[1] == 9
+      assert result[0][0] == 1 and result[0][-1] == 4
+
+      result = g.bidirectional_dijkstra(source = 3, target = 3)
+
+      assert np.array_equal(result[0], np.array([3]))
+      assert result[1] == 0
+
+      rng = np.random.default_rng(1)
+      mtrx = rng.integers(1, 6, (40, 40)).astype(np.float64)
+      mtrx[rng.random((40, 40)) < 0.9] = np.inf
+      np.fill_diagonal(mtrx, 0)
+
+      g = csp.Graph(mtrx, storage = "csr")
+
+      for source, target in rng.integers(0, 40, (50, 2)):
+            tour, shrDist, duration = g.bidirectional_dijkstra(source, target)
+
+            assert shrDist == g.dijkstra(source = source, target = target)[1]
+            if tour is not None:
+                  assert mtrx[tour[:-1], tour[1:]].sum() == shrDist
+
+      mtrx = np.array([
+            [     0,      2],
+            [np.inf,      0]
+      ])
+
+      assert csp.Graph(mtrx).bidirectional_dijkstra(1, 0)[0] is None
+
+def test_contraction_hierarchy():
+
+      """
+      This code tests function cspath.Graph.Graph.contraction_hierarchy
+      """
+
+      g = csp.Graph(tMatrix)
+      ch = g.contraction_hierarchy()
+
+      result = ch.query(0, 6)
+
+      assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+      assert result[1] == 8
+      assert g.contraction_hierarchy() is ch
+      assert sorted(ch.getRanks()) == list(range(7))
+
+      rng = np.random.default_rng(2)
+      mtrx = rng.integers(1, 6, (40, 40)).astype(np.float64)
+      mtrx[rng.random((40, 40)) < 0.9] = np.inf
+      np.fill_diagonal(mtrx, 0)
+
+      g = csp.Graph(mtrx, storage = "csr")
+      ch = g.contraction_hierarchy()
+
+      path = os.path.join(tempfile.mkdtemp(), "graph.ch")
+      ch.save(path)
+      loaded = csp.ContractionHierarchy.load(path)
+
+      for source, target in rng.integers(0, 40, (50, 2)):
+            shrDist = g.dijkstra(source = source, target = target)[1]
+
+            for hierarchy in (ch, loaded):
+                  tour, dist, duration = hierarchy.query(source, target)
+
+                  assert dist == shrDist
+                  if tour is not None:
+                        assert tour[0] == source and tour[-1] == target
+                        assert mtrx[tour[:-1], tour[1:]].sum() == shrDist
+
+      g.setDistanceMatrix(tMatrix)
+
+      assert len(g.contraction_hierarchy()) == 7
+
+      g.save(path)
+
+      try:
+            csp.ContractionHierarchy.load(path)
+            assert False
+      except ValueError:
+            pass
+
+      ch.save(path)
+
+      try:
+            csp.Graph.load(path)
+            assert False
+      except ValueError:
+            pass
+
+      """
+      On a jittered grid, which has no hierarchy to find, shortcuts and preprocessing time stay bounded
+      """
+
+      k = 20
+      cells = np.arange(k * k).reshape(k, k)
+      coords = np.c_[cells.ravel() // k, cells.ravel() % k, np.zeros(k * k)] + rng.uniform(-0.3, 0.3, (k * k, 3)) * [1, 1, 0]
+      edges = np.concatenate((np.stack((cells[:, :-1].ravel(), cells[:, 1:].ravel()), 1),
+                              np.stack((cells[:-1].ravel(), cells[1:].ravel()), 1)))
+
+      g = csp.Graph.from_arrays(coords, edges, np.ones(len(edges), dtype = np.bool_), storage = "csr")
+
+      start = time.time()
+      ch = g.contraction_hierarchy()
+
+      assert time.time() - start < 5
+      assert ch.getNumShortcuts() <= 1.5 * 2 * len(edges)
+
+      for source, target in rng.integers(0, k * k, (20, 2)):
+            assert np.isclose(ch.query(source, target)[1], g.dijkstra(source = source, target = target)[1])
+
 def test_dijkstra_all():
       
       """
@@ -228,6 +855,80 @@ def test_floyd_warshall():
       assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
       assert result[1] == 8 
 
+def test_findNode():
+
+      """
+      This code tests function cspath.Graph.Graph.findNode
+      """
+
+      g = csp.Graph()
+
+      g.addNode(100, 100, 100)
+      g.addNode(300, 200, 400)
+
+      assert g.findNode(300, 200, 400) == 1
+      assert g.findNode(300, 200, 401) is None
+
+      g.changeNode(1, 45, 55, 65)
+
+      assert g.findNode(300, 200, 400) is None
+      assert g.findNode(45, 55, 65) == 1
+      assert g.addNode(300, 200, 400) is not None
+
+      g.changeNode(0, 45, 55, 65)
+
+      assert g.findNode(100, 100, 100) == 0
+
+      g = csp.Graph(tolerance = 0.1)
+
+      g.addNode(1, 2, 3)
+
+      assert g.addNode(1.01, 2, 3) is None
+      assert g.findNode(0.98, 2.02, 3) == 0
+      assert g.findNode(1.2, 2, 3) is None
+
+def test_floyd_warshall_all():
+
+      """
+      This code tests function cspath.Graph.Graph.floyd_warshall_all
+      """
+
+      g = csp.Graph(tMatrix)
+
+      result = g.floyd_warshall_all()
+
+      assert np.array_equal(result[0][0], np.array([0, 5, 1, 3, 4, 11, 8]))
+      assert np.array_equal(result[0], result[0].T)
+      assert np.array_equal(result[1][0], np.array([0, 1, 2, 3, 2, 1, 2]))
+      assert np.array_equal(result[2], np.array([0, 2, 4, 6]))
+      assert result[3] == 8
+
+      blocked = g.floyd_warshall_all(blockSize = 3, numThreads = 2)
+
+      assert np.array_equal(blocked[0], result[0])
+      assert np.array_equal(blocked[2], np.array([0, 2, 4, 6]))
+      assert blocked[3] == 8
+
+      """
+      Graphs large enough to be tiled by default give the same result on a thread pool as in one update
+      """
+
+      n = _FW_BLOCK_MIN_NODES
+      rng = np.random.default_rng(0)
+      mtrx = rng.uniform(1, 10, (n, n))
+      mtrx[rng.random((n, n)) < 0.99] = np.inf
+      np.fill_diagonal(mtrx, 0)
+      g = csp.Graph(mtrx)
+
+      targets = rng.choice(n, 20).tolist()
+      whole = g.floyd_warshall_all(blockSize = n)
+      tiled = g.floyd_warshall_all(targets = targets, numThreads = 4)
+
+      assert np.allclose(whole[0], tiled[0])
+
+      for tour, shrDist in zip(tiled[2], tiled[3]):
+            assert np.isclose(mtrx[tour[:-1].astype(int), tour[1:].astype(int)].sum(), shrDist)
+
 def test_get3DMode():
       
       """
@@ -254,6 +955,25 @@ def test_get3DMode():
       assert not g2.get3DMode()
       assert g3.get3DMode()
 
+def test_getCoordinates():
+
+      """
+      This code tests function cspath.Graph.Graph.getCoordinates
+      """
+
+      g = csp.Graph()
+
+      n1 = g.addNode(100, 200, 300)
+      n2 = g.addNode(500, 500, 500)
+
+      assert np.array_equal(g.getCoordinates(), np.array([[100, 200, 300], [500, 500, 500]]))
+
+      g.changeNode(0, 1, 2, 3)
+
+      assert np.array_equal(n1.get(), np.array([1, 2, 3]))
+      assert g.getNodeList()[1] == n2
+      assert csp.Graph(tMatrix).getCoordinates() is None
+
 def test_getCoordinateMode():
 
       """
@@ -288,6 +1008,131 @@ def test_getDistanceMatrix():
 
       assert np.array_equal(g.getDistanceMatrix(), dm1)
 
+def test_from_arrays():
+
+      """
+      This code tests functions cspath.Graph.Graph.from_arrays, cspath.Graph.Graph.add_nodes and cspath.Graph.Graph.link_many
+      """
+
+      coords = np.array([[0, 0, 0], [-1, -1, 0], [1, -1, 0], [-1.5, -2, 0], [-0.5, -2, 0], [0.5, -2, 0], [1.5, -2, 0]])
+      edges = np.array([[0, 1], [0, 2], [1, 3], [1, 4], [1, 5], [2, 5], [2, 6], [3, 2], [4, 5], [5, 6]])
+      undirected = np.array([False, False, True, True, True, False, True, False, False, False])
+
+      for storage in ("dense", "csr"):
+            g1 = csp.Graph.from_arrays(coords, edges, undirected, storage = storage)
+
+            g2 = csp.Graph(storage = storage)
+            for x, y, z in coords:
+                  g2.addNode(x, y, z)
+            for (i, j), sdirect in zip(edges, undirected):
+                  g2.linkNodes(i, j, bool(sdirect))
+
+            assert np.array_equal(g1.getDistanceMatrix(), g2.getDistanceMatrix())
+            assert np.array_equal(g1.dijkstra()[0], np.array([0, 2, 6]))
+
+      g = csp.Graph()
+
+      assert np.array_equal(g.add_nodes(coords[:3]), np.array([0, 1, 2]))
+      assert np.array_equal(g.add_nodes(np.array([[1, -1, 0], [5, 5, 5]])), np.array([2, 3]))
+      assert g.get3DMode()
+
+      g.link_many(np.array([[0, 3], [3, 3]]))
+
+      assert g.getDistanceMatrix()[0][3] == np.linalg.norm([5, 5, 5])
+      assert g.getDistanceMatrix()[3][0] == -np.inf
+
+def test_from_edge_list():
+
+      """
+      This code tests function cspath.Graph.Graph.from_edge_list
+      """
+
+      folder = tempfile.mkdtemp()
+      rows, cols = np.nonzero(np.isfinite(tMatrix) & (tMatrix != 0))
+      names = np.array(["A", "B", "C", "D", "E", "F", "G"])
+
+      with open(os.path.join(folder, "graph.csv"), "w") as f:
+            f.write("source,target,weight\n")
+            for i, j in zip(rows, cols):
+                  f.write(f"{names[i]},{names[j]},{tMatrix[i][j]}\n")
+
+      with open(os.path.join(folder, "graph.gr"), "w") as f:
+            f.write(f"c tMatrix\np sp 7 {len(rows)}\n")
+            for i, j in zip(rows, cols):
+                  f.write(f"a {i + 1} {j + 1} {int(tMatrix[i][j])}\n")
+
+      with open(os.path.join(folder, "graph.tsv"), "w") as f:
+            for i, j in zip(rows, cols):
+                  if i < j:
+                        f.write(f"{6 - i}\t{6 - j}\n")
+
+      g, ids, rate = csp.Graph.from_edge_list(os.path.join(folder, "graph.csv"), header = True, chunkSize = 5)
+
+      """
+      Nodes are numbered in order of appearance, so E and F swap places
+      """
+
+      perm = np.array([0, 1, 2, 3, 5, 4, 6])
+
+      assert np.array_equal(ids, names[perm])
+      assert np.array_equal(g.getDistanceMatrix(), tMatrix[np.ix_(perm, perm)])
+      assert rate > 0
+
+      g, ids, rate = csp.Graph.from_edge_list(os.path.join(folder, "graph.gr"), storage = "dense")
+
+      assert np.array_equal(ids, np.arange(1, 8))
+      assert np.array_equal(g.getDistanceMatrix(), tMatrix)
+      assert np.array_equal(g.dijkstra()[0], np.array([0, 2, 4, 6]))
+
+      g, ids, rate = csp.Graph.from_edge_list(os.path.join(folder, "graph.tsv"), directed = False)
+
+      perm = 6 - ids.astype(int)
+
+      assert np.array_equal(ids, np.array(["6", "5", "4", "3", "1", "2", "0"]))
+      assert np.array_equal(np.isfinite(g.getDistanceMatrix()), np.isfinite(tMatrix[np.ix_(perm, perm)]))
+
+      """
+      Edges of weight 0 are rejected, with the line they are on
+      """
+
+      with open(os.path.join(folder, "zero.csv"), "w") as f:
+            f.write("source,target,weight\na,b,2\n# comment\nb,c,0\n")
+
+      for storage in ("dense", "csr"):
+            try:
+                  csp.Graph.from_edge_list(os.path.join(folder, "zero.csv"), storage = storage, header = True)
+                  assert False
+            except ValueError as error:
+                  assert "Line 4 " in str(error)
+
+      """
+      Comment and blank lines are skipped without warnings
+      """
+
+      with open(os.path.join(folder, "comments.csv"), "w") as f:
+            f.write("# edges\na,b,2\n\n# more edges\nb,c,3 # inline\n   \n")
+
+      with open(os.path.join(folder, "comments.gr"), "w") as f:
+            f.write("c nodes\np sp 3 2\n\nc arcs\na 1 2 2\na 2 3 3\n")
+
+      for name in ("comments.csv", "comments.gr"):
+            with warnings.catch_warnings():
+                  warnings.simplefilter("error")
+                  g, ids, rate = csp.Graph.from_edge_list(os.path.join(folder, name), storage = "dense")
+
+            assert len(ids) == 3
+            assert np.array_equal(g.dijkstra(0, 2)[0], np.array([0, 1, 2]))
+            assert g.dijkstra(0, 2)[1] == 5
+
+      with open(os.path.join(folder, "zero.csv"), "w") as f:
+            f.write("a,b,2\n\n# comment\n\nb,c,0\n")
+
+      try:
+            csp.Graph.from_edge_list(os.path.join(folder, "zero.csv"), chunkSize = 2)
+            assert False
+      except ValueError as error:
+            assert "Line 5 " in str(error)
+
 def test_getNodeList():
 
       """
@@ -386,6 +1231,17 @@ def test_get_oneighbors():
       assert np.array_equal(g.get_oneighbors(0), np.array([2, 3]))
       assert np.array_equal(g.get_oneighbors(1), np.array([0, 3, 5]))
 
+      mtrx = mtrx.copy()
+      mtrx[0, 3], mtrx[1, 5] = 0, -2
+      g1 = csp.Graph(mtrx, validate = False)
+      g2 = csp.Graph(mtrx, storage = "csr", validate = False)
+
+      for node in range(7):
+            for negIntr in (False, True):
+                  assert np.array_equal(g1.get_oneighbors(node, negIntr), g2.get_oneighbors(node, negIntr))
+
+      assert np.array_equal(g1.get_oneighbors(0), np.array([2]))
+      assert np.array_equal(g1.get_oneighbors(1, True), np.array([0, 3, 5]))
 
 def test_ipq_dijkstra():
 
@@ -415,6 +1271,165 @@ def test_ipq_dijkstra_all():
       assert np.array_equal(result[2], np.array([0, 2, 4, 6]))
       assert result[3] == 8 
 
+def test_batch_shortest_paths():
+
+      """
+      This code tests function cspath.Graph.Graph.batch_shortest_paths
+      """
+
+      g = csp.Graph(tMatrix)
+
+      for engine in ("heap", "scan", "dense"):
+            result = g.batch_shortest_paths([[0, 6], [6, 0], [1, 1], [0, 6], [1, 5]], engine)
+
+            assert np.array_equal(result[1], np.array([8, 8, 0, 8, 6]))
+            assert np.array_equal(result[0][0], np.array([0, 2, 4, 6]))
+            assert np.array_equal(result[0][1], np.array([6, 4, 2, 0]))
+            assert np.array_equal(result[0][2], np.array([1]))
+            assert np.array_equal(result[0][3], np.array([0, 2, 4, 6]))
+            assert np.array_equal(result[0][4], np.array([1, 5]))
+
+      mtrx = np.array([
+            [     0,      2],
+            [np.inf,      0]
+      ])
+
+      result = csp.Graph(mtrx).batch_shortest_paths(np.array([[1, 0], [0, 1]]))
+
+      assert result[0][0] is None
+      assert np.array_equal(result[1], np.array([np.inf, 2]))
+
+def test_queries():
+
+      """
+      This code tests the source, target and targets arguments of the shortest path functions
+      """
+
+      g = csp.Graph(tMatrix)
+
+      solvers = [g.dijkstra, g.ipq_dijkstra, g.bellman_ford, g.spfa, g.johnson, g.floyd_warshall,
+                 lambda **kw: g.dijkstra(engine = "scan", **kw), lambda **kw: g.dijkstra(engine = "dense", **kw)]
+
+      for solver in solvers:
+            result = solver(source = 6, target = 0)
+            assert np.array_equal(result[0], np.array([6, 4, 2, 0]))
+            assert result[1] == 8
+
+            result = solver(source = 1, targets = [5, 1, 4])
+            assert np.array_equal(result[1], np.array([6, 0, 9]))
+            assert np.array_equal(result[0][0], np.array([1, 5]))
+            assert np.array_equal(result[0][1], np.array([1]))
+            assert len(result[0]) == 3
+
+      result = g.a_star(source = 6, target = 0)
+
+      assert np.array_equal(result[0], np.array([6, 4, 2, 0]))
+      assert result[1] == 8
+
+      try:
+            g.dijkstra(source = 7)
+            assert False
+      except ValueError:
+            pass
+
+def test_k_shortest_paths():
+
+      """
+      This code tests function cspath.Graph.Graph.k_shortest_paths
+      """
+
+      g = csp.Graph(tMatrix)
+
+      paths = list(itertools.islice(g.k_shortest_paths(0, 6), 4))
+
+      assert np.array_equal(paths[0][0], np.array([0, 2, 4, 6]))
+      assert [shrDist for tour, shrDist in paths] == [8, 12, 14, 14]
+      assert np.array_equal(paths[1][0], np.array([0, 3, 2, 4, 6]))
+
+      for tour, shrDist in paths:
+            assert tMatrix[tour[:-1], tour[1:]].sum() == shrDist
+
+      """
+      Every simple path is found once and the graph is left as it was
+      """
+
+      paths = list(g.k_shortest_paths(0, 6))
+      lengths = [shrDist for tour, shrDist in paths]
+
+      assert lengths == sorted(lengths)
+      assert len({tuple(tour.tolist()) for tour, shrDist in paths}) == len(paths)
+      assert all(len(set(tour.tolist())) == len(tour) for tour, shrDist in paths)
+      assert np.array_equal(g.getDistanceMatrix(), tMatrix)
+
+      mtrx = np.array([
+            [     0,      2],
+            [np.inf,      0]
+      ])
+
+      assert list(csp.Graph(mtrx).k_shortest_paths(1, 0)) == []
+
+      """
+      Changes made to the graph between two paths are not seen
+      """
+
+      graphs = [csp.Graph(storage = "csr"), csp.Graph(storage = "csr")]
+
+      for g in graphs:
+            for x in range(6):
+                  g.addNode(x, 0, 0)
+            for i in range(5):
+                  g.linkNodes(i, i + 1, False)
+            for i in range(4):
+                  g.linkNodes(i, i + 2, False)
+
+      paths = graphs[0].k_shortest_paths(0, 5)
+      seen = [next(paths)]
+
+      g = graphs[0]
+      g.linkNodes(3, 0, False)
+      g.linkNodes(4, 1, False)
+      g.linkNodes(5, 0, False)
+      seen.append(next(paths))
+
+      g.changeNode(2, 2, 1, 0)
+      g.delLink(3, 5, False)
+      seen.extend(paths)
+
+      expected = list(graphs[1].k_shortest_paths(0, 5))
+
+      assert len(seen) == len(expected) == 8
+      assert all(np.array_equal(a[0], b[0]) and a[1] == b[1] for a, b in zip(seen, expected))
+
+def test_johnson():
+
+      """
+      This code tests functions cspath.Graph.Graph.johnson and cspath.Graph.Graph.johnson_all
+      """
+
+      g = csp.Graph(tMatrix)
+
+      result = g.johnson()
+
+      assert np.array_equal(result[0], np.array([0, 2, 4, 6]))
+      assert result[1] == 8
+
+      result = g.johnson_all()
+
+      assert np.array_equal(result[0], g.floyd_warshall_all()[0])
+      assert np.array_equal(result[1][0], np.array([0, 0, 0, 0, 2, 1, 4]))
+      assert np.array_equal(result[2], np.array([0, 2, 4, 6]))
+      assert result[3] == 8
+
+      mtrx = np.array([
+            [     0,      2, np.inf],
+            [np.inf,      0,     -1],
+            [     4, np.inf,      0]
+      ])
+
+      result = csp.Graph(mtrx).johnson_all()
+
+      assert np.array_equal(result[0], np.array([[0, 2, 1], [3, 0, -1], [4, 6, 0]]))
+
 def test_linkNodes():
       
       """
@@ -481,6 +1496,68 @@ def test_linkNodes():
       assert np.array_equal(g2.getDistanceMatrix(), dm2)
       assert np.array_equal(g3.getDistanceMatrix(), dm3)
 
+def test_save_load():
+
+      """
+      This code tests functions cspath.Graph.Graph.save and cspath.Graph.Graph.load
+      """
+
+      path = os.path.join(tempfile.mkdtemp(), "graph.csp")
+
+      for storage in ("dense", "csr"):
+            g = csp.Graph(tMatrix, storage = storage)
+            g.save(path)
+
+            for mmap in (True, False):
+                  h = csp.Graph.load(path, mmap)
+
+                  assert h.getStorageMode() == storage
+                  assert not h.getCoordinateMode()
+                  assert np.array_equal(h.getDistanceMatrix(), tMatrix)
+                  assert np.array_equal(h.dijkstra()[0], np.array([0, 2, 4, 6]))
+
+            g = csp.Graph(storage = storage)
+            g.add_nodes(np.array([[0, 0, 0], [3, 4, 0], [3, 4, 12]]))
+            g.link_many(np.array([[0, 1], [1, 2]]), np.array([True, False]))
+            g.save(path)
+
+            h = csp.Graph.load(path)
+
+            assert h.getCoordinateMode() and h.get3DMode()
+            assert np.array_equal(h.getCoordinates(), g.getCoordinates())
+            assert np.array_equal(h.getDistanceMatrix(), g.getDistanceMatrix())
+            assert h.findNode(3, 4, 0) == 1
+
+            """
+            Changes to a memory-mapped graph are not written back to the file
+            """
+
+            h.changeNode(1, 0, 4, 0)
+            h.addNode(1, 1, 1)
+
+            assert np.isclose(h.dijkstra(target = 2)[1], 4 + np.sqrt(3 ** 2 + 12 ** 2))
+            assert np.array_equal(csp.Graph.load(path).getCoordinates(), g.getCoordinates())
+
+            """
+            A memory-mapped graph can be saved over its own file, which is replaced rather than overwritten
+            """
+
+            h = csp.Graph.load(path, mmap = True)
+            h.save(path)
+
+            assert np.array_equal(h.getDistanceMatrix(), g.getDistanceMatrix())
+            assert np.array_equal(csp.Graph.load(path).getCoordinates(), g.getCoordinates())
+            assert os.listdir(os.path.dirname(path)) == ["graph.csp"]
+
+      with open(path, "wb") as f:
+            f.write(b"not a graph")
+
+      try:
+            csp.Graph.load(path)
+            assert False
+      except ValueError:
+            pass
+
 def test_setDistanceMatrix():
       
       """
@@ -621,20 +1698,40 @@ test_ipq_dijkstra_all()
 test_bellman_ford_all()
 test_dijkstra_all()
 test_ipq_dijkstra()
+test_IndexedHeap()
 test_floyd_warshall()
+test_findNode()
+test_floyd_warshall_all()
+test_batch_shortest_paths()
+test_queries()
+test_k_shortest_paths()
+test_johnson()
 test_dijkstra()
+test_bidirectional_dijkstra()
+test_contraction_hierarchy()
+test_dynamic_tree()
 test_bellman_ford()
+test_bellman_ford_negative_cycle()
+test_spfa()
+test_shortest_path_tree()
 test_a_star()
+test_landmarks()
 test_IsValidDistanceMatrix()
 test_getDistanceMatrix()
 test_getCoordinateMode()
+test_getCoordinates()
 test_setDistanceMatrix()
+test_save_load()
 test_changeNode()
+test_cache()
+test_csrStorage()
 test_delLink()
 test_get3DMode()
 test_NodeGet()
 test_addNode()
 test_linkNodes()
+test_from_arrays()
+test_from_edge_list()
 test_setNode()
 test_setX()
 test_setY()